@@ -0,0 +1,74 @@
+# Draws a crowd of animated entities facing both ways, flipping each
+# frame image as it is drawn, as entities did, and picking the flipped
+# copy from an Atlas. Checks that both draw the same pixels, then times
+# a frame of each and traces what the atlas path allocates.
+# Run from the repository root: python -m benchmarks.atlas
+import os
+import random
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from scripts.atlas import Atlas
+from scripts.utils import load_images
+
+CLIPS = ['player/idle', 'player/run', 'player/jump', 'player/slide',
+         'player/wall_slide', 'enemy/idle', 'enemy/run']
+COUNTS = [100, 1000, 10000]
+VIEW = (320, 240)
+FRAMES = 50
+
+def sprites(rng, atlas, count):
+    # (clip, frame, flip, pos) per entity.
+    result = []
+    for _ in range(count):
+        clip = rng.choice(CLIPS)
+        result.append((clip, rng.randrange(len(atlas.clips[clip])),
+                       rng.random() < 0.5,
+                       (rng.uniform(-16, VIEW[0]), rng.uniform(-16, VIEW[1]))))
+    return result
+
+def draw_flipped(surf, clips, crowd):
+    surf.blits([(pygame.transform.flip(clips[clip][frame], flip, False), pos)
+                for clip, frame, flip, pos in crowd], doreturn=False)
+
+def draw_atlas(surf, atlas, crowd):
+    surf.blits([(atlas.frame(clip, frame, flip), pos)
+                for clip, frame, flip, pos in crowd], doreturn=False)
+
+def main():
+    pygame.init()
+    pygame.display.set_mode(VIEW)
+    clips = {clip: load_images('entities/' + clip) for clip in CLIPS}
+    atlas = Atlas(clips)
+    print(f'atlas {atlas.surface.get_width()}x{atlas.surface.get_height()} '
+          f'for {sum(len(images) for images in clips.values())} frames')
+    for count in COUNTS:
+        crowd = sprites(random.Random(count), atlas, count)
+        surfs = [pygame.Surface(VIEW, pygame.SRCALPHA) for _ in range(2)]
+        draw_flipped(surfs[0], clips, crowd)
+        draw_atlas(surfs[1], atlas, crowd)
+        assert pygame.image.tobytes(surfs[0], 'RGBA') == \
+            pygame.image.tobytes(surfs[1], 'RGBA')
+
+        times = []
+        for draw in [lambda: draw_flipped(surfs[0], clips, crowd),
+                     lambda: draw_atlas(surfs[1], atlas, crowd)]:
+            start = time.perf_counter()
+            for _ in range(FRAMES):
+                draw()
+            times.append((time.perf_counter() - start) / FRAMES)
+
+        tracemalloc.start()
+        draw_atlas(surfs[1], atlas, crowd)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{count:5} entities: flipping {times[0] * 1000:6.2f} ms  '
+              f'atlas {times[1] * 1000:6.2f} ms ({times[0] / times[1]:.1f}x)  '
+              f'atlas peak {peak / count:.0f} B/entity, retained {retained} B')
+
+if __name__ == '__main__':
+    main()
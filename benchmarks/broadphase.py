@@ -0,0 +1,58 @@
+# Spawns thousands of enemies over a large area and, like Game does for the
+# dash kill, registers them in the spatial hash every frame and queries it
+# with player sized rects. Checks that the hash finds every overlap a scan
+# of all enemies finds and times a frame of both, from the single query
+# the game makes to many. Rebuilding the hash costs as much as dozens of
+# scans, so it only pays off with many queries per frame.
+# Run from the repository root: python -m benchmarks.broadphase
+import random
+import time
+
+import pygame
+
+from scripts.broadphase import SpatialHash
+
+WORLD_SIZE = (4000, 2000)
+ENEMY_SIZE = (8, 15)
+ENEMY_COUNTS = [100, 1000, 10000]
+QUERY_COUNTS = [1, 16, 256]
+FRAMES = 10
+
+def spawn(count, seed):
+    rng = random.Random(seed)
+    return [pygame.Rect(rng.uniform(0, WORLD_SIZE[0]), rng.uniform(0, WORLD_SIZE[1]),
+                        ENEMY_SIZE[0], ENEMY_SIZE[1]) for _ in range(count)]
+
+def scanned(enemies, queries):
+    return [[enemy for enemy in enemies if enemy.colliderect(query)]
+            for query in queries]
+
+def hashed(broadphase, enemies, queries):
+    broadphase.clear()
+    for enemy in enemies:
+        broadphase.insert('enemy', enemy, enemy)
+    return [[enemy for enemy in broadphase.query(query, 'enemy')
+             if enemy.colliderect(query)] for query in queries]
+
+def timed(frame):
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        hits = frame()
+    return hits, (time.perf_counter() - start) / FRAMES
+
+def main():
+    broadphase = SpatialHash(cell_size=32)
+    for enemy_count in ENEMY_COUNTS:
+        enemies = spawn(enemy_count, enemy_count)
+        for query_count in QUERY_COUNTS:
+            queries = spawn(query_count, -query_count)
+            hits, hash_time = timed(lambda: hashed(broadphase, enemies, queries))
+            expected, scan_time = timed(lambda: scanned(enemies, queries))
+            assert hits == expected, (enemy_count, query_count)
+            print(f'{enemy_count:5} enemies {query_count:3} queries: '
+                  f'{sum(map(len, hits)):3} overlaps  '
+                  f'hash {hash_time * 1000:6.2f} ms/frame  '
+                  f'scan {scan_time * 1000:6.2f} ms/frame (same overlaps)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# Stand-ins for the parts of Game the benchmarks drive, shared by them.
+import random
+
+import pygame
+
+from scripts.tilemap import Tilemap, no_size
+
+class BenchPlayer:
+    # Far from every entity and never dashing, so nobody shoots or dies.
+    def __init__(self) -> None:
+        self.pos = [10 ** 6, 10 ** 6]
+        self.dashing = 0
+        self.dash_cooldown = 50
+
+    def rect(self) -> pygame.Rect:
+        return pygame.Rect(self.pos[0], self.pos[1], 8, 15)
+
+class BenchGame:
+    # Only what entities and batches read from a Game: their assets, the
+    # seeded generator they draw from and the player.
+    def __init__(self, assets, seed=0) -> None:
+        self.assets = assets
+        self.rng = random.Random(seed)
+        self.player = BenchPlayer()
+
+def load_tilemap(game, path):
+    # Off-grid tiles get no size, the benchmarks never draw them.
+    tilemap = Tilemap(game, tile_size=16, offgrid_size=no_size)
+    tilemap.load(path)
+    return tilemap
+
+def spawn(tilemap, count, seed, area=(-100, -200, 600, 150), size=(8, 15)):
+    # Top left corners of count boxes of size in area (x0, y0, x1, y1).
+    # Entities start clear of solid tiles, like spawners in real levels.
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        rect = pygame.Rect(rng.uniform(area[0], area[2]),
+                           rng.uniform(area[1], area[3]), *size)
+        if rect.collidelist(tilemap.tile_rects_around(rect.topleft)) < 0:
+            positions.append(rect.topleft)
+    return positions
@@ -0,0 +1,103 @@
+# Checks that EnemyBatch steps exactly like a list of Enemy objects fed
+# the same random draws, then compares steps/sec of both backends.
+# Run from the repository root: python -m benchmarks.enemy_batch
+import os
+import time
+
+import numpy as np
+import pygame
+
+from benchmarks.common import BenchGame, load_tilemap, spawn
+from scripts.enemybatch import EnemyBatch
+from scripts.entities import Enemy
+from scripts.utils import Animation
+
+MAPS_ROOT = 'data/maps/'
+CHECK_ENEMIES = 200
+CHECK_STEPS = 2000
+ENEMY_COUNTS = [10, 100, 1000, 10000]
+BENCH_UPDATES = 200000
+
+class ReplayRandom:
+    # Stands in for the game's generator so that each Enemy draws the
+    # values handed to EnemyBatch.update.
+    def __init__(self) -> None:
+        self.roll = 0
+        self.duration = 0
+
+    def random(self) -> float:
+        return self.roll
+
+    def randint(self, a, b) -> int:
+        return self.duration
+
+def check(game, tilemap, map_name):
+    positions = spawn(tilemap, CHECK_ENEMIES, 0)
+    enemies = [Enemy(game, pos, (8, 15)) for pos in positions]
+    batch = EnemyBatch(game, positions, (8, 15))
+    rng = np.random.default_rng(1)
+
+    replay = ReplayRandom()
+    game_rng = game.rng
+    game.rng = replay
+    try:
+        for _ in range(CHECK_STEPS):
+            rolls = rng.random(CHECK_ENEMIES)
+            durations = rng.integers(30, 121, CHECK_ENEMIES)
+            for i, enemy in enumerate(enemies):
+                replay.roll = rolls[i]
+                replay.duration = int(durations[i])
+                enemy.update(tilemap, (0, 0))
+            batch.update(tilemap, rolls, durations)
+
+            for i, enemy in enumerate(enemies):
+                assert enemy.pos == list(batch.pos[i]), \
+                    (map_name, i, enemy.pos, batch.pos[i])
+                assert enemy.velocity[1] == batch.velocity[i][1]
+                assert enemy.flip == batch.flip[i]
+                assert enemy.walking == batch.walking[i]
+                assert enemy.animation.frame == batch.frame[i]
+                assert all(enemy.collisions[direction] == batch.collisions[direction][i]
+                           for direction in enemy.collisions)
+    finally:
+        game.rng = game_rng
+    print(f'{map_name}: identical over {CHECK_STEPS} steps')
+
+def bench(game, tilemap, count):
+    positions = spawn(tilemap, count, 2)
+    steps = max(BENCH_UPDATES // count, 10)
+    results = {}
+
+    enemies = [Enemy(game, pos, (8, 15)) for pos in positions]
+    start = time.perf_counter()
+    for _ in range(steps):
+        for enemy in enemies:
+            enemy.update(tilemap, (0, 0))
+    results['objects'] = steps / (time.perf_counter() - start)
+
+    batch = EnemyBatch(game, positions, (8, 15), seed=3)
+    batch.update(tilemap)
+    start = time.perf_counter()
+    for _ in range(steps):
+        batch.update(tilemap)
+    results['batch'] = steps / (time.perf_counter() - start)
+    return results
+
+def main():
+    pygame.init()
+    images = [pygame.Surface((1, 1))]
+    game = BenchGame({'enemy/idle': Animation(images * 4, img_dur=6),
+                      'enemy/run': Animation(images * 8, img_dur=4)}, seed=4)
+    for map_name in sorted(os.listdir(MAPS_ROOT)):
+        if not map_name.endswith('.json'):
+            continue
+        tilemap = load_tilemap(game, MAPS_ROOT + map_name)
+        check(game, tilemap, map_name)
+        for count in ENEMY_COUNTS:
+            results = bench(game, tilemap, count)
+            print(f'  {count:5} enemies: ' + '  '.join(
+                f'{name} {rate:9.1f} steps/s' for name, rate in results.items())
+                + f'  ({results["batch"] / results["objects"]:.1f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Pans a camera along a long synthetic level populated with more and more
+# enemies, timing frames that update every enemy against frames that
+# only update the ones an ActivityRegion keeps awake.
+# Run from the repository root: python -m benchmarks.enemy_regions
+import random
+import time
+
+import pygame
+
+from benchmarks.common import BenchGame
+from scripts.entities import Enemy
+from scripts.regions import ActivityRegion
+from scripts.tilemap import Tilemap
+from scripts.utils import Animation
+
+LEVEL_WIDTH = 4096
+GROUND = 64
+VIEW_SIZE = (320, 240)
+POPULATIONS = [100, 1000, 10000]
+FRAMES = 200
+CAMERA_SPEED = 4
+
+def build_level(game):
+    tilemap = Tilemap(game, tile_size=16)
+    for x in range(LEVEL_WIDTH):
+        for y in range(GROUND, GROUND + 3):
+            tilemap.tilemap.set(x, y, 'stone', 1)
+    return tilemap
+
+def spawn(game, tilemap, count, seed):
+    rng = random.Random(seed)
+    return [Enemy(game, (rng.uniform(0, LEVEL_WIDTH * tilemap.tile_size),
+                         GROUND * tilemap.tile_size - 15), (8, 15))
+            for _ in range(count)]
+
+def run(tilemap, enemies, regions):
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        view = pygame.Rect(frame * CAMERA_SPEED, GROUND * tilemap.tile_size - 160,
+                           *VIEW_SIZE)
+        if regions:
+            enemies.focus(view)
+            updated = enemies.active
+        else:
+            updated = enemies
+        for enemy in updated:
+            enemy.update(tilemap, (0, 0))
+    return (time.perf_counter() - start) / FRAMES
+
+def main():
+    animation = Animation([None] * 4)
+    game = BenchGame({'enemy/idle': animation, 'enemy/run': animation})
+    tilemap = build_level(game)
+    for count in POPULATIONS:
+        all_time = run(tilemap, spawn(game, tilemap, count, 1), False)
+        region = ActivityRegion(spawn(game, tilemap, count, 1))
+        region_time = run(tilemap, region, True)
+        print(f'{count:6} enemies: all active {all_time * 1000:7.2f} ms/frame  '
+              f'regions {region_time * 1000:5.2f} ms/frame '
+              f'({len(region.active)} active at the end)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# Traces the memory entity simulation steps leave allocated once the
+# entities have settled into a steady state, counting only blocks
+# allocated by the entity and collision code, and fails if a step keeps
+# any of them.
+# Run from the repository root: python -m benchmarks.entity_alloc
+import fnmatch
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+from benchmarks.common import BenchGame, load_tilemap, spawn
+from scripts.entities import Enemy, PhysicsEntity, Player
+from scripts.utils import Animation
+
+MAP_PATH = 'data/maps/0.json'
+ENTITY_COUNT = 50
+WARMUP_STEPS = 200
+TRACE_WARMUP_STEPS = 10
+MEASURE_STEPS = 500
+BENCH_STEPS = 2000
+
+# Allocations made on lines of these files in scripts/ are counted. They
+# include objects pygame makes for those lines, like rects, but none of
+# the interpreter's own, so a step that keeps nothing leaves exactly
+# zero blocks behind.
+TRACED_FILES = ['entities.py', 'collision.py', 'tilemap.py']
+
+def scenarios(game, tilemap):
+    positions = spawn(tilemap, ENTITY_COUNT, 0, area=(0, -100, 500, 150))
+    physics = [PhysicsEntity(game, 'bench', pos, (8, 15)) for pos in positions]
+    idle = [Enemy(game, pos, (8, 15)) for pos in positions]
+    for enemy in idle:
+        enemy.wake_up_chance = 0
+    walking = [Enemy(game, pos, (8, 15)) for pos in positions]
+    for enemy in walking:
+        enemy.wake_up_chance = 1
+    players = [Player(game, pos, (8, 15)) for pos in positions]
+    return [('physics entities', physics, (0, 0)),
+            ('idle enemies', idle, (0, 0)),
+            ('walking enemies', walking, (0, 0)),
+            ('players', players, (0, 0))]
+
+def step(entities, tilemap, movement):
+    for entity in entities:
+        entity.update(tilemap, movement)
+
+def state(entities):
+    # Every value the entities hold in their attributes, and the items of
+    # the lists, tuples and dicts among them.
+    values = []
+    for entity in entities:
+        for cls in type(entity).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                value = getattr(entity, name, None)
+                values.append(value)
+                if isinstance(value, dict):
+                    values.extend(value.values())
+                elif isinstance(value, (list, tuple)):
+                    values.extend(value)
+    return values
+
+def held(entities, filters) -> int:
+    # How many of the blocks on traced lines are values the entities
+    # hold. Their count moves as a position swaps a small int, which is
+    # never allocated, for a float, or a constant movement tuple for a
+    # new one, and does not mean memory is kept.
+    count = 0
+    for value in state(entities):
+        traceback = tracemalloc.get_object_traceback(value)
+        if traceback and any(fnmatch.fnmatch(traceback[0].filename, 
+                                             f.filename_pattern)
+                             for f in filters):
+            count += 1
+    return count
+
+def trace(entities, tilemap, movement):
+    # Blocks allocated on TRACED_FILES lines and still held after
+    # MEASURE_STEPS steps, per line, and how many more of them the
+    # entities hold as their state, which has as many values as before. Objects made before tracing starts are not
+    # traced, so the first traced steps only replace them and are left
+    # out.
+    filters = [tracemalloc.Filter(True, os.path.join('*', 'scripts', name))
+               for name in TRACED_FILES]
+    tracemalloc.start()
+    for _ in range(TRACE_WARMUP_STEPS):
+        step(entities, tilemap, movement)
+    # A full collection also empties the float free list, whose floats
+    # tracemalloc still counts as allocated.
+    gc.collect()
+    before = tracemalloc.take_snapshot().filter_traces(filters)
+    held_before = held(entities, filters)
+    size_before = len(state(entities))
+    for _ in range(MEASURE_STEPS):
+        step(entities, tilemap, movement)
+    gc.collect()
+    after = tracemalloc.take_snapshot().filter_traces(filters)
+    held_after = held(entities, filters)
+    grown = len(state(entities)) - size_before
+    tracemalloc.stop()
+    kept = [stat for stat in after.compare_to(before, 'lineno') if stat.count_diff]
+    # Values piling up in the state are kept memory all the same.
+    return kept, held_after - held_before - grown
+
+def main():
+    animation = Animation([None] * 4)
+    game = BenchGame({e_type + '/' + action: animation
+                      for e_type in ['bench', 'enemy', 'player']
+                      for action in ['idle', 'run', 'jump', 'wall_slide']}, seed=1)
+    tilemap = load_tilemap(game, MAP_PATH)
+
+    failed = False
+    for name, entities, movement in scenarios(game, tilemap):
+        # Only entities that came to rest on the ground are in a steady 
+        # state, the others fall out of the level.
+        for _ in range(WARMUP_STEPS):
+            step(entities, tilemap, movement)
+        entities = [entity for entity in entities if entity.collisions['down']]
+        kept, state_blocks = trace(entities, tilemap, movement)
+
+        start = time.perf_counter()
+        for _ in range(BENCH_STEPS):
+            step(entities, tilemap, movement)
+        rate = BENCH_STEPS * len(entities) / (time.perf_counter() - start)
+
+        blocks = sum(stat.count_diff for stat in kept) - state_blocks
+        failed = failed or blocks != 0
+        print(f'{name:>16}: {blocks:4} blocks kept in {MEASURE_STEPS} steps'
+              f' ({state_blocks:+} held as entity state)'
+              f'  {rate / 1000:6.1f}k updates/s  {"ok" if blocks == 0 else "FAIL"}')
+        if blocks:
+            for stat in kept:
+                print(f'{"":18}{stat}')
+
+    if failed:
+        sys.exit('entity steps keep memory allocated')
+
+if __name__ == '__main__':
+    main()
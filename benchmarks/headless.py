@@ -0,0 +1,23 @@
+# Plays the shipped levels headless with the rollouts' runner policy and
+# reports how many simulation steps per second each enemy backend runs.
+# Run from the repository root: python -m benchmarks.headless
+import time
+
+from game import Game
+from rollouts import POLICIES
+
+STEPS = 5000
+
+def main():
+    for backend in ['objects', 'batch']:
+        start = time.perf_counter()
+        game = Game(enemy_backend=backend, headless=True, seed=0)
+        setup = time.perf_counter() - start
+
+        rate = game.simulate(STEPS, POLICIES['runner'](0))
+        print(f'{backend:>7}: {rate:8.0f} steps/s  (setup {setup * 1000:.0f} ms, '
+              f'{game.steps} steps, level {game.level}, '
+              f'{len(game.enemies)} enemies left, dead {game.dead})')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Scatters trees over a wide level and pans the camera across it. Drops
+# leaves by rolling for every tree every step, as the game did, and with
+# a LeafScheduler, lets them fall as game particles, then compares how
+# many live leaves are in view per step and what deciding the drops of a
+# step costs each way.
+# Run from the repository root: python -m benchmarks.leaves
+import math
+import random
+import time
+
+import pygame
+
+from scripts.leafscheduler import LeafScheduler
+from scripts.particlebatch import ParticleBatch
+from scripts.utils import Animation, load_images
+
+VIEW_SIZE = (320, 240)
+WORLD_WIDTH = 20000
+COUNTS = [50, 500, 5000]
+SPAWN_RATE = 49999
+LEAF_VELOCITY = (-0.1, 0.3)
+STEPS = 20000
+
+def trees(rng, count):
+    return [pygame.Rect(rng.uniform(0, WORLD_WIDTH), rng.uniform(0, 480), 23, 13)
+            for _ in range(count)]
+
+def view_at(step):
+    # Pans right across the level and back at 4 pixels a step.
+    x = step * 4 % (WORLD_WIDTH * 2)
+    return (min(x, WORLD_WIDTH * 2 - x), 120)
+
+def spawn_rolls(spawners, rng, step, view):
+    spawned = []
+    for rect in spawners:
+        if rng.random() * SPAWN_RATE < rect.width * rect.height:
+            spawned.append((rect, 0))
+    return spawned
+
+def spawn_scheduled(scheduler, step, view):
+    scheduler.focus((view, VIEW_SIZE), step)
+    return scheduler.due(step)
+
+def run(spawn, animation, rng):
+    # Live leaves in view per step, averaged once the first leaves could
+    # have died, and seconds per step spent deciding drops.
+    leaves = ParticleBatch({'leaf': animation}, sway=['leaf'])
+    lifetime = animation.img_duration * len(animation.images)
+    in_view = 0
+    spawn_time = 0
+    for step in range(STEPS):
+        view = view_at(step)
+        start = time.perf_counter()
+        spawned = spawn(step, view)
+        spawn_time += time.perf_counter() - start
+        for rect, age in spawned:
+            leaves.emit('leaf', (rect.x + rng.random() * rect.width,
+                                 rect.y + rng.random() * rect.height),
+                        [LEAF_VELOCITY], [rng.randint(0, 20)], ages=[age])
+        leaves.update()
+        if step >= lifetime:
+            pos = leaves.pos[:len(leaves)]
+            in_view += ((pos[:, 0] >= view[0]) & (pos[:, 0] < view[0] + VIEW_SIZE[0])
+                        & (pos[:, 1] >= view[1])
+                        & (pos[:, 1] < view[1] + VIEW_SIZE[1])).sum()
+    return in_view / (STEPS - lifetime), spawn_time / STEPS
+
+def main():
+    animation = Animation(load_images('particles/leaf'), img_dur=20, loop=False)
+    lifetime = animation.img_duration * len(animation.images)
+    # As in Game.load_level.
+    margin = math.ceil(lifetime * max(map(abs, LEAF_VELOCITY))) + 18 + 8 + 23
+    for count in COUNTS:
+        spawners = trees(random.Random(count), count)
+        rng = random.Random(0)
+        rolls = run(lambda step, view: spawn_rolls(spawners, rng, step, view),
+                    animation, random.Random(1))
+        scheduler = LeafScheduler(spawners, SPAWN_RATE, random.Random(0),
+                                  margin=margin, lifetime=lifetime)
+        scheduled = run(lambda step, view: spawn_scheduled(scheduler, step, view),
+                        animation, random.Random(1))
+        print(f'{count:5} trees: live leaves in view rolls {rolls[0]:6.1f} '
+              f'scheduled {scheduled[0]:6.1f}  '
+              f'step rolls {rolls[1] * 1e6:7.1f} us '
+              f'scheduled {scheduled[1] * 1e6:5.1f} us '
+              f'({rolls[1] / scheduled[1]:.0f}x)')
+
+if __name__ == '__main__':
+    main()
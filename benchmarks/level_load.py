@@ -0,0 +1,71 @@
+# Compares JSON and binary level load times on the shipped maps, whose
+# binary levels are cached the way the game does it, and on large
+# synthetic maps.
+# Run from the repository root: python -m benchmarks.level_load
+import os
+import random
+import tempfile
+import time
+
+from scripts.levelfile import LEVEL_EXT
+from scripts.tilemap import Tilemap
+
+MAPS_ROOT = 'data/maps/'
+SYNTHETIC_SIZES = [(256, 256), (1024, 1024)]
+REPEATS = 5
+
+def new_tilemap():
+    tilemap = Tilemap(None)
+    return tilemap
+
+def build_synthetic(width, height, seed=0):
+    rng = random.Random(seed)
+    tilemap = new_tilemap()
+    for x in range(width):
+        for y in range(height):
+            if rng.random() < 0.6:
+                tilemap.tilemap.set(x, y, rng.choice(['grass', 'stone']), 
+                                    rng.randint(0, 8))
+    for _ in range(width * height // 100):
+        tilemap.add_offgrid({'type': 'large_decor', 
+                             'variant': rng.randint(0, 2), 
+                             'pos': [rng.random() * width * 16, 
+                                     rng.random() * height * 16]})
+    return tilemap
+
+def time_load(path) -> float:
+    best = None
+    for _ in range(REPEATS):
+        tilemap = new_tilemap()
+        start = time.perf_counter()
+        tilemap.load(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def report(name, json_path, level_path):
+    json_time, level_time = time_load(json_path), time_load(level_path)
+    print(f'{name:>12}: json {json_time * 1000:9.2f} ms '
+          f'({os.path.getsize(json_path) / 1024:8.0f} KiB)  '
+          f'binary {level_time * 1000:9.2f} ms '
+          f'({os.path.getsize(level_path) / 1024:8.0f} KiB)  '
+          f'x{json_time / level_time:.0f}')
+
+def main():
+    for name in sorted(os.listdir(MAPS_ROOT)):
+        if name.endswith('.json'):
+            new_tilemap().load_cached(MAPS_ROOT + name)
+            report(name, MAPS_ROOT + name, 
+                   MAPS_ROOT + name[:-len('.json')] + LEVEL_EXT)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for width, height in SYNTHETIC_SIZES:
+            tilemap = build_synthetic(width, height)
+            json_path = os.path.join(tmp, 'map.json')
+            level_path = os.path.join(tmp, 'map' + LEVEL_EXT)
+            tilemap.save(json_path)
+            tilemap.save(level_path)
+            report(f'{width}x{height}', json_path, level_path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Streams a large synthetic level past a moving camera, checking physics
+# queries against a fully loaded copy and reporting residency.
+# Run from the repository root: python -m benchmarks.level_streaming
+import os
+import random
+import tempfile
+import time
+
+from scripts.levelfile import LEVEL_EXT
+from scripts.tilemap import Tilemap
+from scripts.tilestore import CHUNK_SIZE
+
+LEVEL_SIZE = (4096, 256)
+VIEW_SIZE = (320, 240)
+FRAMES = 3000
+CAMERA_SPEED = 24
+QUERIES_PER_FRAME = 20
+
+def new_tilemap(storage):
+    tilemap = Tilemap(None, storage=storage)
+    return tilemap
+
+def build_level(path, seed=0):
+    rng = random.Random(seed)
+    tilemap = new_tilemap('grid')
+    for x in range(LEVEL_SIZE[0]):
+        ground = 128 + int(40 * rng.random())
+        for y in range(ground, LEVEL_SIZE[1]):
+            tilemap.tilemap.set(x, y, 'stone' if y > ground + 2 else 'grass', 
+                                rng.randint(0, 8))
+    tilemap.save(path)
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'big' + LEVEL_EXT)
+        build_level(path)
+        print(f'{LEVEL_SIZE[0]}x{LEVEL_SIZE[1]} tiles, '
+              f'{os.path.getsize(path) / 1024:.0f} KiB on disk')
+
+        streamed = new_tilemap('stream')
+        streamed.load(path)
+        loaded = new_tilemap('grid')
+        loaded.load(path)
+
+        rng = random.Random(1)
+        chunk_px = CHUNK_SIZE * streamed.tile_size
+        scroll = [0, 128 * 16 - VIEW_SIZE[1] // 2]
+        peak = 0
+        elapsed = 0
+        for frame in range(FRAMES):
+            scroll[0] = (frame * CAMERA_SPEED) % (LEVEL_SIZE[0] * 16)
+            start = time.perf_counter()
+            streamed.stream(scroll, VIEW_SIZE)
+            for _ in range(QUERIES_PER_FRAME):
+                # Half the queries sit right on a chunk border.
+                pos = [scroll[0] + rng.random() * VIEW_SIZE[0], 
+                       scroll[1] + rng.random() * VIEW_SIZE[1]]
+                if rng.random() < 0.5:
+                    pos[0] = round(pos[0] / chunk_px) * chunk_px - rng.random()
+                assert bool(streamed.solid_check(pos)) == bool(loaded.solid_check(pos))
+                assert streamed.physics_rects_around(pos) == \
+                    loaded.physics_rects_around(pos)
+            elapsed += time.perf_counter() - start
+            peak = max(peak, len(streamed.tilemap.chunks))
+
+        store = streamed.tilemap
+        print(f'{FRAMES} frames: {elapsed / FRAMES * 1e6:.0f} us/frame, '
+              f'{store.loads} chunk loads, {store.evictions} evictions, '
+              f'peak {peak}/{len(store.directory)} chunks resident '
+              f'(budget {store.max_chunks})')
+
+if __name__ == '__main__':
+    main()
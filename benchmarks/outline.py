@@ -0,0 +1,101 @@
+# Draws frames of a headless game with more and more projectiles and
+# sparks on screen and shades their outline two ways: reading the whole
+# display back into a mask, as the game did, and gathering the cached
+# masks of what was drawn in an Outline. Checks that both shade the same
+# pixels, then times drawing plus outlining a frame each way. Gathering
+# only wins while a frame draws at most Outline.max_sprites sprites and
+# spark polygons, each polygon still reading its own rect back. Past that
+# the outline falls back to the readback and costs the same.
+# Run from the repository root: python -m benchmarks.outline
+import math
+import random
+import time
+
+import pygame
+
+from game import Game
+from scripts.outline import OFFSETS, Outline
+from scripts.projectiles import ProjectileBatch
+from scripts.sparkbatch import SparkBatch
+
+COUNTS = [0, 100, 300, 1000, 5000]
+WARMUP_STEPS = 300
+FRAMES = 200
+
+def draw(game, render_scroll, outline=None) -> None:
+    # Game.render_world and Game.render_entities, with or without an
+    # outline gathering masks.
+    game.display.fill((0, 0, 0, 0))
+    game.display_2.blit(game.assets['background'], (0, 0))
+    game.clouds.render(game.display_2, offset=render_scroll)
+    game.tilemap.enqueue(game.sprites, (*render_scroll, *game.display.get_size()))
+    if outline:
+        outline.clear()
+    game.sprites.draw(game.display, offset=render_scroll, outline=outline)
+    for enemy in game.enemies.active:
+        enemy.enqueue(game.sprites)
+    game.player.enqueue(game.sprites)
+    game.sprites.draw(game.display, offset=render_scroll, outline=outline)
+    game.projectiles.render(game.display, game.assets['projectile'],
+                            offset=render_scroll, outline=outline)
+    game.sparks.render(game.display, offset=render_scroll, outline=outline)
+
+def readback_outline(game) -> None:
+    # Game.render_outline before Outline.
+    display_mask = pygame.mask.from_surface(game.display)
+    display_silhouette = display_mask.to_surface(setcolor=(0, 0, 0, 180),
+                                                 unsetcolor=(0, 0, 0, 0))
+    for offset in OFFSETS:
+        game.display_2.blit(display_silhouette, offset)
+
+def frame_readback(game, render_scroll, outline) -> None:
+    draw(game, render_scroll)
+    readback_outline(game)
+
+def frame_outline(game, render_scroll, outline) -> None:
+    draw(game, render_scroll, outline)
+    outline.render(game.display_2)
+
+def populate(game, render_scroll, count) -> None:
+    rng = random.Random(count)
+    for _ in range(count):
+        pos = (render_scroll[0] + rng.uniform(0, 320),
+               render_scroll[1] + rng.uniform(0, 240))
+        game.projectiles.spawn(pos, rng.choice([-1.5, 1.5]))
+    if count:
+        game.sparks.emit([(render_scroll[0] + rng.uniform(0, 320),
+                           render_scroll[1] + rng.uniform(0, 240))
+                          for _ in range(count // 10)],
+                         [rng.random() * math.pi * 2 for _ in range(count // 10)],
+                         [rng.random() * 3 + 2 for _ in range(count // 10)])
+
+def main():
+    game = Game(headless=True, seed=0)
+    game.simulate(WARMUP_STEPS)
+    render_scroll = (int(game.scroll[0]), int(game.scroll[1]))
+    outline = Outline(game.display)
+    for count in COUNTS:
+        game.projectiles = ProjectileBatch()
+        game.sparks = SparkBatch()
+        populate(game, render_scroll, count)
+
+        frames = []
+        for frame in [frame_readback, frame_outline]:
+            frame(game, render_scroll, outline)
+            frames.append(pygame.image.tobytes(game.display_2, 'RGB'))
+        assert frames[0] == frames[1], count
+
+        fallback = outline.sprites > outline.max_sprites
+        times = []
+        for frame in [frame_readback, frame_outline]:
+            start = time.perf_counter()
+            for _ in range(FRAMES):
+                frame(game, render_scroll, outline)
+            times.append((time.perf_counter() - start) / FRAMES)
+        print(f'{count:5} projectiles, {count // 10:4} sparks: '
+              f'readback {times[0] * 1000:6.2f} ms  '
+              f'outline {times[1] * 1000:6.2f} ms ({times[0] / times[1]:.2f}x)'
+              + ('  past max_sprites, reads back' if fallback else ''))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# Keeps a population of leaves and burst particles topped up, checks that
+# ParticleBatch steps and draws them exactly like a list of Particle
+# objects, then times updating and drawing a frame of them both ways.
+# Run from the repository root: python -m benchmarks.particles
+import math
+import random
+import time
+
+import pygame
+
+from benchmarks.common import BenchGame
+from scripts.particle import Particle
+from scripts.particlebatch import ParticleBatch
+from scripts.utils import Animation, load_images
+
+VIEW = (0, 0, 320, 240)
+COUNTS = [1000, 10000, 100000]
+MAX_OBJECTS = 10000
+CHECK_COUNT = 3000
+CHECK_FRAMES = 400
+FRAMES = 30
+BURST = 30
+
+def new_batch(game):
+    return ParticleBatch({'leaf': game.assets['particle/leaf'],
+                          'particle': game.assets['particle/particle']},
+                         sway=['leaf'])
+
+def bursts(rng, count):
+    # (type, pos, velocities, frames) per burst of up to BURST particles.
+    result = []
+    while count > 0:
+        size = min(count, BURST)
+        count -= size
+        if rng.random() < 0.3:
+            result.append(('leaf', (rng.uniform(0, 320), rng.uniform(0, 240)),
+                           [(-0.1, 0.3)] * size,
+                           [rng.randint(0, 20) for _ in range(size)]))
+        else:
+            speeds = [(rng.random() * math.pi * 2, rng.random() * 2.5)
+                      for _ in range(size)]
+            result.append(('particle', (rng.uniform(0, 320), rng.uniform(0, 240)),
+                           [(math.cos(angle) * speed, math.sin(angle) * speed)
+                            for angle, speed in speeds],
+                           [rng.randint(0, 7) for _ in range(size)]))
+    return result
+
+def emit_objects(game, particles, emitted):
+    for p_type, pos, velocities, frames in emitted:
+        for velocity, frame in zip(velocities, frames):
+            particles.append(Particle(game, p_type, pos, velocity=velocity,
+                                      frame=frame))
+
+def emit_batch(batch, emitted):
+    for p_type, pos, velocities, frames in emitted:
+        batch.emit(p_type, pos, velocities, frames)
+
+def update_objects(particles):
+    # Game.update_effects before ParticleBatch.
+    for particle in particles.copy():
+        kill = particle.update()
+        if particle.type == 'leaf':
+            particle.pos[0] += math.sin(particle.animation.frame * 0.035) * 0.3
+        if kill:
+            particles.remove(particle)
+
+def render_objects(particles, surf):
+    for particle in particles:
+        particle.render(surf, offset=VIEW[:2])
+
+def check(game):
+    rng = random.Random(0)
+    particles, batch = [], new_batch(game)
+    for frame in range(CHECK_FRAMES):
+        emitted = bursts(rng, CHECK_COUNT - len(particles))
+        emit_objects(game, particles, emitted)
+        emit_batch(batch, emitted)
+        update_objects(particles)
+        batch.update()
+        assert [particle.pos for particle in particles] == \
+            batch.pos[:len(batch)].tolist(), frame
+        assert [particle.animation.frame for particle in particles] == \
+            batch.frame[:len(batch)].tolist(), frame
+
+    surfs = [pygame.Surface(VIEW[2:]), pygame.Surface(VIEW[2:])]
+    render_objects(particles, surfs[0])
+    batch.render(surfs[1], offset=VIEW[:2])
+    assert pygame.image.tobytes(surfs[0], 'RGB') == \
+        pygame.image.tobytes(surfs[1], 'RGB')
+    print(f'identical over {CHECK_FRAMES} frames of {CHECK_COUNT} particles')
+
+def bench(emit, update, render, population):
+    # Seconds per frame spent topping up and updating the particles and
+    # spent drawing them, all of them on screen.
+    rng = random.Random(0)
+    surf = pygame.Surface(VIEW[2:])
+    emit(bursts(rng, population()))
+    update_time = render_time = 0
+    for _ in range(FRAMES):
+        start = time.perf_counter()
+        emit(bursts(rng, population()))
+        update()
+        update_time += time.perf_counter() - start
+        start = time.perf_counter()
+        render(surf)
+        render_time += time.perf_counter() - start
+    return update_time / FRAMES, render_time / FRAMES
+
+def main():
+    game = BenchGame({
+        'particle/leaf': Animation(load_images('particles/leaf'),
+                                   img_dur=20, loop=False),
+        'particle/particle': Animation(load_images('particles/particle'),
+                                       img_dur=6, loop=False),
+    })
+    check(game)
+    for count in COUNTS:
+        batch = new_batch(game)
+        times = bench(lambda emitted: emit_batch(batch, emitted), batch.update,
+                      lambda surf: batch.render(surf, offset=VIEW[:2]),
+                      lambda: count - len(batch))
+        line = f'{count:6} particles: batch update {times[0] * 1000:6.2f} ms ' \
+            f'render {times[1] * 1000:7.2f} ms'
+        if count <= MAX_OBJECTS:
+            particles = []
+            object_times = bench(lambda emitted: emit_objects(game, particles, emitted),
+                                 lambda: update_objects(particles),
+                                 lambda surf: render_objects(particles, surf),
+                                 lambda: count - len(particles))
+            line += f'  objects update {object_times[0] * 1000:7.2f} ms ' \
+                f'({object_times[0] / times[0]:.0f}x) ' \
+                f'render {object_times[1] * 1000:7.2f} ms'
+        print(line)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Checks that merged collision geometry resolves exactly like per-tile
+# rects, then compares entity update throughput on the shipped maps.
+# Run from the repository root: python -m benchmarks.physics_rects
+import os
+import random
+import time
+
+from benchmarks import common
+from benchmarks.common import BenchGame
+from scripts.entities import PhysicsEntity
+from scripts.utils import Animation
+
+MAPS_ROOT = 'data/maps/'
+CHECK_STEPS = 2000
+ENTITY_COUNTS = [10, 100, 500]
+BENCH_STEPS = 200
+
+def load_tilemap(game, path, merged=True):
+    tilemap = common.load_tilemap(game, path)
+    if not merged:
+        tilemap.physics_rects_around = tilemap.tile_rects_around
+    return tilemap
+
+def spawn(game, tilemap, count, seed):
+    return [PhysicsEntity(game, 'bench', pos, (8, 15)) 
+            for pos in common.spawn(tilemap, count, seed)]
+
+def step(entities, tilemap, rng):
+    for entity in entities:
+        if rng.random() < 0.02:
+            entity.velocity[1] = -3
+        if rng.random() < 0.01:
+            entity.velocity[0] = rng.choice([-8, 8])
+        entity.velocity[0] *= 0.9
+        entity.update(tilemap, (rng.choice([-1, 0, 1]), 0))
+
+def main():
+    game = BenchGame({'bench/idle': Animation([None])})
+    for map_name in sorted(os.listdir(MAPS_ROOT)):
+        if not map_name.endswith('.json'):
+            continue
+        merged = load_tilemap(game, MAPS_ROOT + map_name)
+        reference = load_tilemap(game, MAPS_ROOT + map_name, merged=False)
+
+        entities = spawn(game, reference, 50, 0)
+        expected = spawn(game, reference, 50, 0)
+        rng, ref_rng = random.Random(1), random.Random(1)
+        for _ in range(CHECK_STEPS):
+            step(entities, merged, rng)
+            step(expected, reference, ref_rng)
+            for entity, other in zip(entities, expected):
+                assert entity.pos == other.pos, (map_name, entity.pos, other.pos)
+                assert entity.collisions == other.collisions
+        print(f'{map_name}: identical over {CHECK_STEPS} steps')
+
+        for count in ENTITY_COUNTS:
+            results = {}
+            for name, tilemap in [('per-tile', reference), ('merged', merged)]:
+                entities = spawn(game, reference, count, 2)
+                rng = random.Random(3)
+                start = time.perf_counter()
+                for _ in range(BENCH_STEPS):
+                    step(entities, tilemap, rng)
+                results[name] = BENCH_STEPS * count / (time.perf_counter() - start)
+            print(f'  {count:4} entities: ' + '  '.join(
+                f'{name} {rate / 1000:7.1f}k updates/s' 
+                for name, rate in results.items()))
+
+if __name__ == '__main__':
+    main()
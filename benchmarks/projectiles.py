@@ -0,0 +1,121 @@
+# Fills a shipped level with thousands of projectiles, kept topped up as
+# they hit walls. Checks that ProjectileBatch moves them exactly like the
+# old list of [[x, y], direction, timer] projectiles, then times a frame
+# of updating and drawing them with both against a 60 FPS budget.
+# Run from the repository root: python -m benchmarks.projectiles
+import random
+import time
+
+import pygame
+
+from scripts.projectiles import ProjectileBatch
+from scripts.tilemap import Tilemap
+from scripts.utils import load_image
+
+MAP_PATH = 'data/maps/0.json'
+VIEW = (160, 0, 320, 240)
+COUNTS = [1000, 5000, 10000, 50000]
+MAX_LISTS = 10000
+CHECK_FRAMES = 300
+FRAMES = 60
+LIFETIME = 360
+FRAME_BUDGET = 1 / 60
+
+def load_tilemap():
+    tilemap = Tilemap(None, tile_size=16)
+    tilemap.load(MAP_PATH)
+    return tilemap
+
+def new_projectiles(rng, count):
+    return [((rng.uniform(-100, 700), rng.uniform(-100, 300)),
+             rng.choice([-1.5, 1.5])) for _ in range(count)]
+
+def update_lists(projectiles, tilemap):
+    hits = []
+    for projectile in projectiles.copy():
+        hit = tilemap.segment_hit(projectile[0],
+                                  (projectile[0][0] + projectile[1],
+                                   projectile[0][1]))
+        projectile[0][0] += projectile[1]
+        projectile[2] += 1
+        if hit:
+            projectile[0] = hit['pos']
+            projectiles.remove(projectile)
+            hits.append([*projectile[0], projectile[1]])
+        elif projectile[2] > LIFETIME:
+            projectiles.remove(projectile)
+    return hits
+
+def render_lists(projectiles, surf, img, offset):
+    for projectile in projectiles:
+        surf.blit(img, (projectile[0][0] - img.get_width() / 2 - offset[0],
+                        projectile[0][1] - img.get_height() / 2 - offset[1]))
+
+def frame_lists(projectiles, tilemap, rng, count, surf, img):
+    update_lists(projectiles, tilemap)
+    for pos, direction in new_projectiles(rng, count - len(projectiles)):
+        projectiles.append([list(pos), direction, 0])
+    render_lists(projectiles, surf, img, VIEW[:2])
+
+def frame_batch(projectiles, tilemap, rng, count, surf, img):
+    projectiles.update(tilemap)
+    for pos, direction in new_projectiles(rng, count - len(projectiles)):
+        projectiles.spawn(pos, direction)
+    projectiles.render(surf, img, offset=VIEW[:2])
+
+def check(tilemap, img):
+    lists, batch = [], ProjectileBatch(lifetime=LIFETIME)
+    for pos, direction in new_projectiles(random.Random(0), 2000):
+        lists.append([list(pos), direction, 0])
+        batch.spawn(pos, direction)
+    hits = 0
+    for frame in range(CHECK_FRAMES):
+        expected = update_lists(lists, tilemap)
+        assert sorted(batch.update(tilemap)) == sorted(expected), frame
+        alive = sorted((*projectile[0], projectile[1], projectile[2])
+                       for projectile in lists)
+        assert sorted(zip(batch.pos[:len(batch), 0].tolist(),
+                          batch.pos[:len(batch), 1].tolist(),
+                          batch.direction[:len(batch)].tolist(),
+                          batch.timer[:len(batch)].tolist())) == alive, frame
+        hits += len(expected)
+
+    # Swap-remove reorders the rows and overlapping projectiles blend, so
+    # the lists draw in row order.
+    rows = [[[x, y], direction, 0] for x, y, direction
+            in zip(batch.pos[:len(batch), 0].tolist(),
+                   batch.pos[:len(batch), 1].tolist(),
+                   batch.direction[:len(batch)].tolist())]
+    surfs = [pygame.Surface(VIEW[2:]), pygame.Surface(VIEW[2:])]
+    render_lists(rows, surfs[0], img, VIEW[:2])
+    batch.render(surfs[1], img, offset=VIEW[:2])
+    assert pygame.image.tobytes(surfs[0], 'RGB') == \
+        pygame.image.tobytes(surfs[1], 'RGB')
+    print(f'identical over {CHECK_FRAMES} frames ({hits} wall hits)')
+
+def bench(frame_fn, projectiles, tilemap, count, img):
+    rng = random.Random(count)
+    surf = pygame.Surface(VIEW[2:])
+    frame_fn(projectiles, tilemap, rng, count, surf, img)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        frame_fn(projectiles, tilemap, rng, count, surf, img)
+    return (time.perf_counter() - start) / FRAMES
+
+def main():
+    tilemap = load_tilemap()
+    img = load_image('projectile.png')
+    check(tilemap, img)
+    for count in COUNTS:
+        batch_time = bench(frame_batch, ProjectileBatch(lifetime=LIFETIME),
+                           tilemap, count, img)
+        line = f'{count:6} projectiles: batch {batch_time * 1000:7.2f} ms/frame ' \
+            f'({"within" if batch_time < FRAME_BUDGET else "over"} 60 FPS)'
+        if count <= MAX_LISTS:
+            list_time = bench(frame_lists, [], tilemap, count, img)
+            line += f'  lists {list_time * 1000:8.2f} ms/frame ' \
+                f'({list_time / batch_time:.1f}x)'
+        print(line)
+
+if __name__ == '__main__':
+    main()
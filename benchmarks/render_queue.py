@@ -0,0 +1,53 @@
+# Draws a layer of sprites scattered over the world, one blit call per
+# sprite with the camera offset subtracted each time, and through a
+# RenderQueue that submits the layer in one call. Checks that both
+# draw the same pixels, then times a frame of each.
+# Run from the repository root: python -m benchmarks.render_queue
+import random
+import time
+
+import pygame
+
+from scripts.renderqueue import RenderQueue
+from scripts.utils import load_images
+
+VIEW = (160, 40, 320, 240)
+COUNTS = [50, 500, 5000]
+FRAMES = 200
+
+def sprites(rng, images, count):
+    return [(rng.choice(images), (rng.uniform(VIEW[0] - 16, VIEW[0] + VIEW[2]),
+                                  rng.uniform(VIEW[1] - 16, VIEW[1] + VIEW[3])))
+            for _ in range(count)]
+
+def draw_each(surf, layer, offset):
+    for img, pos in layer:
+        surf.blit(img, (pos[0] - offset[0], pos[1] - offset[1]))
+
+def draw_queue(surf, layer, offset, queue):
+    queue.extend(layer)
+    queue.draw(surf, offset)
+
+def main():
+    images = load_images('tiles/grass') + load_images('tiles/decor')
+    queue = RenderQueue()
+    for count in COUNTS:
+        layer = sprites(random.Random(count), images, count)
+        surfs = [pygame.Surface(VIEW[2:], pygame.SRCALPHA) for _ in range(2)]
+        draw_each(surfs[0], layer, VIEW[:2])
+        draw_queue(surfs[1], layer, VIEW[:2], queue)
+        assert pygame.image.tobytes(surfs[0], 'RGBA') == \
+            pygame.image.tobytes(surfs[1], 'RGBA')
+
+        times = []
+        for draw in [lambda: draw_each(surfs[0], layer, VIEW[:2]),
+                     lambda: draw_queue(surfs[1], layer, VIEW[:2], queue)]:
+            start = time.perf_counter()
+            for _ in range(FRAMES):
+                draw()
+            times.append((time.perf_counter() - start) / FRAMES)
+        print(f'{count:5} sprites: per blit {times[0] * 1000:6.3f} ms  '
+              f'queued {times[1] * 1000:6.3f} ms ({times[0] / times[1]:.1f}x)')
+
+if __name__ == '__main__':
+    main()
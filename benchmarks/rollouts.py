@@ -0,0 +1,45 @@
+# Runs the same set of headless rollouts on pools of 1 to N worker
+# processes, checking every pool size returns the same outcomes, and
+# reports rollouts and simulation steps per second against one process.
+# Run from the repository root: python -m benchmarks.rollouts [max processes]
+import os
+import sys
+import time
+
+from rollouts import POLICIES, rollout_tasks, run_rollouts
+
+SEEDS = range(4)
+LEVELS = range(3)
+MAX_STEPS = 1200
+
+def run(tasks, processes):
+    start = time.perf_counter()
+    results = [result for batch in run_rollouts(tasks, processes)
+               for result in batch]
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda result: (result['seed'], result['level'], result['policy']))
+    return results, elapsed
+
+def main():
+    max_processes = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    counts = [1]
+    while counts[-1] * 2 <= max_processes:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_processes:
+        counts.append(max_processes)
+
+    tasks = rollout_tasks(SEEDS, LEVELS, list(POLICIES), max_steps=MAX_STEPS)
+    print(f'{len(tasks)} rollouts of up to {MAX_STEPS} steps, '
+          f'{os.cpu_count()} cpus')
+    expected = None
+    for processes in counts:
+        results, elapsed = run(tasks, processes)
+        if expected is None:
+            expected, base = results, elapsed
+        assert results == expected, processes
+        steps = sum(result['steps'] for result in results)
+        print(f'{processes:3} processes: {len(results) / elapsed:6.1f} rollouts/s '
+              f'{steps / elapsed:8.0f} steps/s  speedup {base / elapsed:4.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# Keeps thousands of sparks in flight, topped up in bursts like enemy
+# deaths and shots make them. Checks that SparkBatch moves and draws them
+# exactly like a list of Spark objects, then times updating and drawing
+# a frame of them both ways, and drawing them as cached sprites.
+# Run from the repository root: python -m benchmarks.sparks
+import math
+import random
+import time
+
+import pygame
+
+from scripts.spark import Spark
+from scripts.sparkbatch import SparkBatch
+
+VIEW = (0, 0, 320, 240)
+COUNTS = [1000, 5000, 20000]
+CHECK_COUNT = 2000
+CHECK_FRAMES = 200
+FRAMES = 30
+BURST = 32
+
+def bursts(rng, count):
+    # (pos, angles, speeds) per burst of up to BURST sparks.
+    result = []
+    while count > 0:
+        size = min(count, BURST)
+        count -= size
+        result.append(((rng.uniform(-20, 340), rng.uniform(-20, 260)),
+                       [rng.random() * math.pi * 2 for _ in range(size)],
+                       [rng.random() * 3 + 2 for _ in range(size)]))
+    return result
+
+def emit_objects(sparks, emitted):
+    for pos, angles, speeds in emitted:
+        for angle, speed in zip(angles, speeds):
+            sparks.append(Spark(pos, angle, speed))
+
+def emit_batch(batch, emitted):
+    for pos, angles, speeds in emitted:
+        batch.emit(pos, angles, speeds)
+
+def update_objects(sparks):
+    # Game.update_effects before SparkBatch.
+    for spark in sparks.copy():
+        kill = spark.update()
+        if kill:
+            sparks.remove(spark)
+
+def render_objects(sparks, surf):
+    for spark in sparks:
+        spark.render(surf, offset=VIEW[:2])
+
+def check():
+    rng = random.Random(0)
+    sparks, batch = [], SparkBatch()
+    for frame in range(CHECK_FRAMES):
+        emitted = bursts(rng, CHECK_COUNT - len(sparks))
+        emit_objects(sparks, emitted)
+        emit_batch(batch, emitted)
+        update_objects(sparks)
+        batch.update()
+        assert [spark.pos for spark in sparks] == \
+            batch.pos[:len(batch)].tolist(), frame
+        assert [spark.speed for spark in sparks] == \
+            batch.speed[:len(batch)].tolist(), frame
+
+    surfs = [pygame.Surface(VIEW[2:]), pygame.Surface(VIEW[2:])]
+    render_objects(sparks, surfs[0])
+    batch.render(surfs[1], offset=VIEW[:2])
+    assert pygame.image.tobytes(surfs[0], 'RGB') == \
+        pygame.image.tobytes(surfs[1], 'RGB')
+    print(f'identical over {CHECK_FRAMES} frames of {CHECK_COUNT} sparks')
+
+def bench(emit, update, render, population):
+    # Seconds per frame spent topping up and updating the sparks and
+    # spent drawing them.
+    rng = random.Random(0)
+    surf = pygame.Surface(VIEW[2:])
+    emit(bursts(rng, population()))
+    update_time = render_time = 0
+    for _ in range(FRAMES):
+        start = time.perf_counter()
+        emit(bursts(rng, population()))
+        update()
+        update_time += time.perf_counter() - start
+        start = time.perf_counter()
+        render(surf)
+        render_time += time.perf_counter() - start
+    return update_time / FRAMES, render_time / FRAMES
+
+def main():
+    check()
+    for count in COUNTS:
+        batch, sparks = SparkBatch(), []
+        times = bench(lambda emitted: emit_batch(batch, emitted), batch.update,
+                      lambda surf: batch.render(surf, offset=VIEW[:2]),
+                      lambda: count - len(batch))
+        sprite_batch = SparkBatch(sprites=True)
+        sprite_times = bench(lambda emitted: emit_batch(sprite_batch, emitted),
+                             sprite_batch.update,
+                             lambda surf: sprite_batch.render(surf, offset=VIEW[:2]),
+                             lambda: count - len(sprite_batch))
+        object_times = bench(lambda emitted: emit_objects(sparks, emitted),
+                             lambda: update_objects(sparks),
+                             lambda surf: render_objects(sparks, surf),
+                             lambda: count - len(sparks))
+        print(f'{count:6} sparks: batch update {times[0] * 1000:6.2f} ms '
+              f'render {times[1] * 1000:6.2f} ms '
+              f'(sprites {sprite_times[1] * 1000:6.2f} ms)  '
+              f'objects update {object_times[0] * 1000:7.2f} ms '
+              f'render {object_times[1] * 1000:7.2f} ms '
+              f'({sum(object_times) / sum(times):.1f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Compares the chunk-baked tile renderer with per-tile blitting.
+# Run from the repository root: python -m benchmarks.tilemap_render
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from benchmarks.common import BenchGame
+from scripts.tilemap import Tilemap
+from scripts.utils import load_images
+
+MAPS_ROOT = 'data/maps/'
+FRAMES = 2000
+
+def scrolls(frames):
+    # Sweeps the camera back and forth across the level.
+    for i in range(frames):
+        yield (int((i * 3) % 800) - 200, int((i * 1) % 300) - 150)
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((320, 240))
+    game = BenchGame({
+        'decor': load_images('tiles/decor'),
+        'grass': load_images('tiles/grass'),
+        'large_decor': load_images('tiles/large_decor'),
+        'stone': load_images('tiles/stone'),
+        'spawners': load_images('tiles/spawners'),
+    })
+    display = pygame.Surface((320, 240), pygame.SRCALPHA)
+    reference = pygame.Surface((320, 240), pygame.SRCALPHA)
+
+    for map_name in sorted(os.listdir(MAPS_ROOT)):
+        tilemap = Tilemap(game, tile_size=16)
+        tilemap.load(MAPS_ROOT + map_name)
+
+        for offset in scrolls(200):
+            display.fill((0, 0, 0, 0))
+            reference.fill((0, 0, 0, 0))
+            tilemap.render(display, offset=offset)
+            tilemap.render_tiles(reference, offset=offset)
+            assert pygame.image.tobytes(display, 'RGBA') == \
+                pygame.image.tobytes(reference, 'RGBA'), offset
+
+        results = {}
+        for name, render in [('per-tile', tilemap.render_tiles), 
+                             ('chunked', tilemap.render)]:
+            start = time.perf_counter()
+            for offset in scrolls(FRAMES):
+                render(display, offset=offset)
+            results[name] = FRAMES / (time.perf_counter() - start)
+        print(f'{map_name}: ' + '  '.join(
+            f'{name} {rate:8.0f} frames/s' for name, rate in results.items()))
+
+if __name__ == '__main__':
+    main()
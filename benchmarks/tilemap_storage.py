@@ -0,0 +1,64 @@
+# Compares the tile storage backends on a large synthetic map.
+# Run from the repository root: python -m benchmarks.tilemap_storage
+import random
+import time
+import tracemalloc
+
+from scripts.tilemap import TILE_STORES, Tilemap
+
+MAP_SIZES = [(64, 64), (256, 256), (1024, 512)]
+FILL_RATIO = 0.6
+QUERIES = 200000
+TILE_TYPES = ['grass', 'stone', 'decor']
+
+def build_tiles(width, height, seed=0):
+    rng = random.Random(seed)
+    tiles = {}
+    for x in range(width):
+        for y in range(height):
+            if rng.random() < FILL_RATIO:
+                tiles[str(x) + ';' + str(y)] = {'type': rng.choice(TILE_TYPES), 
+                                                'variant': rng.randint(0, 8), 
+                                                'pos': [x, y]}
+    return tiles
+
+def measure_memory(storage, tiles) -> float:
+    tracemalloc.start()
+    store = TILE_STORES[storage]()
+    if storage == 'dict':
+        # The dict backend adopts the parsed JSON as is, so count a copy.
+        store.load_json({k: dict(v, pos=list(v['pos'])) for k, v in tiles.items()})
+    else:
+        store.load_json(tiles)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(store)
+
+def measure_lookups(storage, tiles, width, height) -> dict:
+    tilemap = Tilemap(None, tile_size=16, storage=storage)
+    tilemap.tilemap.load_json(tiles)
+    rng = random.Random(1)
+    points = [(rng.random() * width * 16, rng.random() * height * 16) 
+              for _ in range(QUERIES)]
+    
+    results = {}
+    for name, query in [('solid_check', tilemap.solid_check), 
+                        ('physics_rects_around', tilemap.physics_rects_around)]:
+        start = time.perf_counter()
+        for point in points:
+            query(point)
+        results[name] = QUERIES / (time.perf_counter() - start)
+    return results
+
+def main():
+    for width, height in MAP_SIZES:
+        tiles = build_tiles(width, height)
+        print(f'{width}x{height} map, {len(tiles)} tiles')
+        for storage in ['dict', 'grid']:
+            memory = measure_memory(storage, tiles)
+            lookups = measure_lookups(storage, tiles, width, height)
+            print(f'  {storage:5} {memory:8.1f} B/tile' + ''.join(
+                f'  {name} {rate / 1000:8.1f}k/s' for name, rate in lookups.items()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+# Writes the binary level of every JSON map ahead of time. The game also
+# writes them itself the first time it loads a map, or after it changed.
+import os
+import sys
+
+from scripts.levelfile import LEVEL_EXT
+from scripts.tilemap import Tilemap
+
+MAPS_ROOT = 'data/maps/'
+
+def convert(json_path) -> str:
+    tilemap = Tilemap(None)
+    tilemap.load(json_path)
+    level_path = os.path.splitext(json_path)[0] + LEVEL_EXT
+    tilemap.save(level_path)
+    return level_path
+
+if __name__ == '__main__':
+    paths = sys.argv[1:] or [MAPS_ROOT + name 
+                             for name in sorted(os.listdir(MAPS_ROOT)) 
+                             if name.endswith('.json')]
+    for path in paths:
+        print(path, '->', convert(path))
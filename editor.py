@@ -46,6 +46,7 @@ class Editor :
         self.right_clicking = False
         self.shift = False
         self.change_variant = False
+        self.live_autotile = False
     
     def handle_events(self) -> None:
         events = pygame.event.get()
@@ -57,7 +58,7 @@ class Editor :
                         mpos = pygame.mouse.get_pos()
                         mpos = (mpos[0] // RENDER_SCALE, mpos[1] // RENDER_SCALE)
                         print(mpos[0], mpos[1], self.scroll[0], self.scroll[1])
-                        self.tilemap.offgrid_tiles.append({
+                        self.tilemap.add_offgrid({
                             'type': self.tile_list[self.tile_group],
                             'variant': self.tile_variant,
                             'pos': (mpos[0] + self.scroll[0], mpos[1] + self.scroll[1])
@@ -102,6 +103,8 @@ class Editor :
                     self.tilemap.save('map.json')
                 if event.key == pygame.K_t:
                     self.tilemap.autotile()
+                if event.key == pygame.K_y:
+                    self.live_autotile = not self.live_autotile
             if event.type == pygame.KEYUP:
                 if event.key == pygame.K_q:
                     self.movement[0] = False
@@ -122,6 +125,7 @@ class Editor :
             self.scroll[1] += (self.movement[3] - self.movement[2]) * 2
 
             render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
+            self.tilemap.stream(render_scroll, self.display.get_size())
 
             self.tilemap.render(self.display, offset=render_scroll)
 
@@ -141,26 +145,23 @@ class Editor :
             else:
                 self.display.blit(current_tile_img, mpos)
 
-            tile_loc = str(tile_pos[0]) + ';' + str(tile_pos[1])
-            
             if self.clicking and self.ongrid:
-                self.tilemap.tilemap[tile_loc] = {
-                    'type': self.tile_list[self.tile_group],
-                    'variant': self.tile_variant,
-                    'pos': tile_pos
-                }
+                # With live autotiling the variant is picked by autotile, 
+                # so only paint over tiles of another type.
+                if not self.live_autotile or \
+                    self.tilemap.tilemap.type_at(*tile_pos) != self.tile_list[self.tile_group]:
+                    self.tilemap.place(tile_pos, 
+                                       self.tile_list[self.tile_group], 
+                                       self.tile_variant)
             if self.right_clicking:
-                if tile_loc in self.tilemap.tilemap:
-                    del self.tilemap.tilemap[tile_loc]
-                
-                for tile in self.tilemap.offgrid_tiles.copy():
-                    tile_img = self.assets[tile['type']][tile['variant']]
-                    tile_r = pygame.Rect(tile['pos'][0] - self.scroll[0],
-                                         tile['pos'][1] - self.scroll[1], 
-                                         tile_img.get_width(), 
-                                         tile_img.get_height())
-                    if tile_r.collidepoint(mpos):
-                        self.tilemap.offgrid_tiles.remove(tile)
+                self.tilemap.erase(tile_pos)
+
+                for tile in self.tilemap.offgrid_at((mpos[0] + self.scroll[0],
+                                                     mpos[1] + self.scroll[1])):
+                    self.tilemap.remove_offgrid(tile)
+
+            if self.live_autotile:
+                self.tilemap.autotile_dirty()
 
             self.display.blit(current_tile_img, (5, 5))
 
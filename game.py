@@ -1,69 +1,152 @@
 import random
 import math
 import os
+import sys
+import time
 
 import pygame
 
+from scripts.atlas import Atlas
 from scripts.entities import PhysicsEntity, Player, Enemy
+from scripts.broadphase import SpatialHash
+from scripts.regions import ActivityRegion
+from scripts.enemybatch import EnemyBatch
+from scripts.governor import EffectsGovernor
 from scripts.tilemap import Tilemap
+from scripts.leafscheduler import LeafScheduler
 from scripts.clouds import Clouds
-from scripts.utils import load_image, load_images, Animation
-from scripts.particle import Particle
-from scripts.spark import Spark
+from scripts.utils import load_image, load_images, Animation, SilentSound
+from scripts.outline import Outline
+from scripts.particlebatch import ParticleBatch
+from scripts.projectiles import ProjectileBatch
+from scripts.renderqueue import RenderQueue
+from scripts.replay import Replay
+from scripts.sparkbatch import SparkBatch
 
 MAPS_ROOT = 'data/maps/'
+# Leaves fall at LEAF_VELOCITY, and their sway takes them at most
+# LEAF_SWAY pixels further to either side.
+LEAF_VELOCITY = (-0.1, 0.3)
+LEAF_SWAY = 18
 IMAGES_ROOT = 'data/images/'
 SFX_ROOT = 'data/sfx/'
 
 class Game:
-    def __init__(self) -> None:
+    def __init__(self, enemy_backend: str='objects', sim_rate: int=60, 
+                 max_fps: int=120, max_catch_up: int=5, 
+                 headless: bool=False, seed: int=None, 
+                 record: str=None, storage: str='grid') -> None:
+        # A headless game opens no window and plays no sound: it is 
+        # stepped by simulate() with scripted input, also on machines 
+        # without a display or sound card, and render() draws off screen.
+        self.headless = headless
+        if headless:
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+            os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
         pygame.init()
 
-        pygame.display.set_caption('ninja game')
-        self.screen = pygame.display.set_mode((640, 480))
+        # 'objects' runs one Enemy per enemy, 'batch' one EnemyBatch for
+        # all of them.
+        self.enemy_backend = enemy_backend
+        # Tile storage of the levels, a key of tilemap.TILE_STORES: 'stream'
+        # keeps only the chunks around the camera in memory.
+        self.storage = storage
+
+        # The game steps sim_rate times per second of real time whatever
+        # the frame rate, which is capped at max_fps (0 for no cap). A
+        # slow frame is caught up with at most max_catch_up steps, past 
+        # which the game slows down rather than stalling.
+        self.sim_rate = sim_rate
+        self.max_fps = max_fps
+        self.max_catch_up = max_catch_up
+        self.sim_time = 0
+        self.render_time = 0
+        # Thins out particles and sparks when frames fall behind the
+        # steps. Its stats() report the budget and what it held back.
+        self.effects = EffectsGovernor(self, frame_budget=1 / sim_rate)
+
+        if headless:
+            self.screen = pygame.Surface((640, 480))
+        else:
+            pygame.display.set_caption('ninja game')
+            self.screen = pygame.display.set_mode((640, 480))
         self.display = pygame.Surface((320, 240), pygame.SRCALPHA)
         self.display_2 = pygame.Surface((320, 240))
+        # Sprites of the layer being drawn, submitted in one blits call.
+        self.sprites = RenderQueue()
+        # Gathers the masks of what is drawn on display for its outline.
+        self.outline = Outline(self.display)
 
         self.clock = pygame.time.Clock()
         self.dt = 0
 
         self.running = True
+        self.steps = 0
+        self.script = None
+
+        # Every random draw of the simulation comes from rng, so the seed
+        # and the keys of a session are enough to play it again. The 
+        # screenshake only moves the picture and draws from render_rng, 
+        # since the number of frames per step varies from run to run.
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.render_rng = random.Random(seed)
+
+        # The keys handled at each step are recorded into a replay, saved
+        # to the record path when run() ends.
+        self.record = record
+        self.recording = Replay(seed, enemy_backend) if record else None
+
+        # Entity frames and the gun are packed into an atlas beside their
+        # flipped copies, so facing left costs nothing while playing.
+        self.atlas = Atlas({
+            'player/idle': load_images('entities/player/idle'),
+            'player/run': load_images('entities/player/run'),
+            'player/jump': load_images('entities/player/jump'),
+            'player/slide': load_images('entities/player/slide'),
+            'player/wall_slide': load_images('entities/player/wall_slide'),
+            'enemy/idle': load_images('entities/enemy/idle'),
+            'enemy/run': load_images('entities/enemy/run'),
+            'gun': [load_image('gun.png')],
+        })
 
         self.assets = {
             'decor': load_images('tiles/decor'),
             'grass': load_images('tiles/grass'),
             'large_decor': load_images('tiles/large_decor'),
             'stone': load_images('tiles/stone'),
+            'spawners': load_images('tiles/spawners'),
             'player': load_image('entities/player.png'),
             'background': load_image('background.png'),
             'clouds': load_images('clouds'),
-            'player/idle': Animation(load_images('entities/player/idle'), 
-                                     img_dur=6),
-            'player/run': Animation(load_images('entities/player/run'), 
-                                    img_dur=4),
-            'player/jump': Animation(load_images('entities/player/jump')),
-            'player/slide': Animation(load_images('entities/player/slide')),
-            'player/wall_slide': Animation( \
-                load_images('entities/player/wall_slide')),
-            'enemy/idle': Animation(load_images('entities/enemy/idle'), 
-                                    img_dur=6),
-            'enemy/run': Animation(load_images('entities/enemy/run'), 
-                                   img_dur=4),
+            'player/idle': self.atlas.animation('player/idle', img_dur=6),
+            'player/run': self.atlas.animation('player/run', img_dur=4),
+            'player/jump': self.atlas.animation('player/jump'),
+            'player/slide': self.atlas.animation('player/slide'),
+            'player/wall_slide': self.atlas.animation('player/wall_slide'),
+            'enemy/idle': self.atlas.animation('enemy/idle', img_dur=6),
+            'enemy/run': self.atlas.animation('enemy/run', img_dur=4),
             'particle/leaf': Animation(load_images('particles/leaf'), 
                                        img_dur=20, loop=False),
             'particle/particle': Animation(load_images('particles/particle'), 
                                            img_dur=6, loop=False),
-            'gun': load_image('gun.png'),
+            'gun': self.atlas.frame('gun'),
             'projectile': load_image('projectile.png'),
         }
 
-        self.sfx = {
-            'jump': pygame.mixer.Sound(SFX_ROOT + 'jump.wav'),
-            'dash': pygame.mixer.Sound(SFX_ROOT + 'dash.wav'),
-            'hit': pygame.mixer.Sound(SFX_ROOT + 'hit.wav'),
-            'shoot': pygame.mixer.Sound(SFX_ROOT + 'shoot.wav'),
-            'ambience': pygame.mixer.Sound(SFX_ROOT + 'ambience.wav'),
-        }
+        if headless:
+            self.sfx = {name: SilentSound() 
+                        for name in ['jump', 'dash', 'hit', 'shoot', 'ambience']}
+        else:
+            self.sfx = {
+                'jump': pygame.mixer.Sound(SFX_ROOT + 'jump.wav'),
+                'dash': pygame.mixer.Sound(SFX_ROOT + 'dash.wav'),
+                'hit': pygame.mixer.Sound(SFX_ROOT + 'hit.wav'),
+                'shoot': pygame.mixer.Sound(SFX_ROOT + 'shoot.wav'),
+                'ambience': pygame.mixer.Sound(SFX_ROOT + 'ambience.wav'),
+            }
 
         self.sfx['ambience'].set_volume(0.2)
         self.sfx['shoot'].set_volume(0.4)
@@ -74,10 +157,13 @@ class Game:
         self.player = Player(self, (50, 50), (8, 15))
         self.movement = [False, False]
 
-        self.tilemap = Tilemap(self, tile_size=16)
+        self.tilemap = Tilemap(self, tile_size=16, storage=storage)
         self.tilemap.load('map.json')
 
-        self.clouds = Clouds(self.assets['clouds'], count=16)
+        self.clouds = Clouds(self.assets['clouds'], count=16, rng=self.rng)
+
+        # Enemies register in it every frame.
+        self.broadphase = SpatialHash(cell_size=32)
 
         self.projectile_lifetime = 360
 
@@ -93,53 +179,106 @@ class Game:
         self.screen_shake_force = 16
         self.player_fall_time_limit = 120
     
+    def level_count(self) -> int:
+        return len([name for name in os.listdir(MAPS_ROOT) 
+                    if name.endswith('.json')])
+
     def load_level(self, map_id):
-        self.tilemap.load(MAPS_ROOT + str(map_id) + '.json')
+        self.tilemap.load_cached(MAPS_ROOT + str(map_id) + '.json')
 
         self.leaf_spawners = []
         for tree in self.tilemap.extract([('large_decor', 2)], keep=True):
             self.leaf_spawners.append(pygame.Rect(tree['pos'][0] + 4, 
                                                   tree['pos'][1] + 4, 23, 13))
         self.leaf_spawn_rate = 49999
-
-        self.enemies = []
+        # Trees further from the view than a leaf gets from its tree in
+        # its lifetime, counting the size of the leaf and of the 23x13
+        # area it drops from, never have a leaf in view.
+        leaf = self.assets['particle/leaf']
+        leaf_lifetime = leaf.img_duration * len(leaf.images)
+        leaf_reach = math.ceil(leaf_lifetime * max(map(abs, LEAF_VELOCITY))) \
+            + LEAF_SWAY + max(leaf.images[0].get_size()) + 23
+        self.leaves = LeafScheduler(self.leaf_spawners, self.leaf_spawn_rate, 
+                                    self.rng, margin=leaf_reach, 
+                                    lifetime=leaf_lifetime)
+
+        enemy_positions = []
         for spawner in self.tilemap.extract([('spawners', 0), ('spawners', 1)]):
             if spawner['variant'] == 0:
                 self.player.pos = spawner['pos']
+                self.player.prev_pos = list(spawner['pos'])
                 self.player.air_time = 0
             else:
-                self.enemies.append(Enemy(self, spawner['pos'], (8, 15)))
+                enemy_positions.append(spawner['pos'])
+        if self.enemy_backend == 'batch':
+            self.enemies = EnemyBatch(self, enemy_positions, (8, 15), 
+                                      seed=self.rng.getrandbits(32))
+        else:
+            # Enemies away from the camera are dormant until it gets close.
+            self.enemies = ActivityRegion([Enemy(self, pos, (8, 15)) 
+                                           for pos in enemy_positions])
         
-        self.projectiles = []
-        self.particles = []
-        self.sparks = []
+        self.projectiles = ProjectileBatch(lifetime=self.projectile_lifetime)
+        self.particles = ParticleBatch({'leaf': self.assets['particle/leaf'], 
+                                        'particle': self.assets['particle/particle']}, 
+                                       sway=['leaf'])
+        self.sparks = SparkBatch()
 
         self.scroll = [0, 0]
+        self.prev_scroll = [0, 0]
 
         self.dead = 0
 
         self.transition = -self.transition_timer
     
     def handle_events(self) -> None:
+        # A script, such as a replay, stands in for the keyboard.
+        if self.script:
+            for key, pressed in self.script(self):
+                self.handle_key(key, pressed)
+            return
+        if self.headless:
+            return
+
         events = pygame.event.get()
         for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT:
-                    self.movement[0] = True
-                if event.key == pygame.K_RIGHT:
-                    self.movement[1] = True
-                if event.key == pygame.K_SPACE:
-                    if self.player.jump():
-                        self.sfx['jump'].play()
-                if event.key == pygame.K_c:
-                    self.player.dash()
+                self.handle_key(event.key, True)
             if event.type == pygame.KEYUP:
-                if event.key == pygame.K_LEFT:
-                    self.movement[0] = False
-                if event.key == pygame.K_RIGHT:
-                    self.movement[1] = False
+                self.handle_key(event.key, False)
+
+    def handle_key(self, key, pressed) -> None:
+        if self.recording:
+            self.recording.record(self.steps, key, pressed)
+        if pressed:
+            if key == pygame.K_LEFT:
+                self.movement[0] = True
+            if key == pygame.K_RIGHT:
+                self.movement[1] = True
+            if key == pygame.K_SPACE:
+                if self.player.jump():
+                    self.sfx['jump'].play()
+            if key == pygame.K_c:
+                self.player.dash()
+        else:
+            if key == pygame.K_LEFT:
+                self.movement[0] = False
+            if key == pygame.K_RIGHT:
+                self.movement[1] = False
+
+    def simulate(self, steps, script=None) -> float:
+        # Steps a headless game as fast as it can, until steps are done or 
+        # the game stops running. After each step script(game) returns the 
+        # (key, pressed) pairs to feed in. Returns the steps per second.
+        self.script = script
+        done = 0
+        start = time.perf_counter()
+        while done < steps and self.running:
+            self.step()
+            done += 1
+        return done / (time.perf_counter() - start)
 
     def run(self) -> None:
         pygame.mixer.music.load('data/music.wav')
@@ -148,158 +287,228 @@ class Game:
 
         self.sfx['ambience'].play(-1)
 
+        step_time = 1 / self.sim_rate
+        accumulator = 0
         while self.running:
-            self.display.fill((0, 0, 0, 0))
-            self.display_2.blit(self.assets['background'], (0, 0))
-
-            self.screenshake = max(self.screenshake - 1, 0)
-
-            if not len(self.enemies):
-                self.transition += 1
-                if self.transition > self.transition_timer:
-                    self.level = min(self.level + 1, len(os.listdir(MAPS_ROOT)) - 1)
-                    self.load_level(self.level)
-            if self.transition < 0:
-                self.transition += 1
-
-            if self.dead:
-                self.dead += 1
-                if self.dead >= self.restart_timer - self.transition_timer:
-                    self.transition = min(self.transition + 1, 
-                                          self.transition_timer)
-                if self.dead > self.restart_timer:
-                    self.load_level(self.level)
-
-            self.scroll[0] += (self.player.rect().centerx - \
-                               self.display.get_width() / 2 - \
-                                self.scroll[0]) / self.camera_acc
-
-            self.scroll[1] += (self.player.rect().centery - \
-                               self.display.get_height() / 2 - \
-                                self.scroll[1]) / self.camera_acc
-            
-            render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
-
-            for rect in self.leaf_spawners:
-                if random.random() * self.leaf_spawn_rate < \
-                    rect.width * rect.height:
-                    pos = (rect.x + random.random() * rect.width, 
-                           rect.y + random.random() * rect.height)
-                    self.particles.append(Particle(self, 'leaf', pos, 
-                                                   velocity=[-0.1, 0.3], 
-                                                   frame=random.randint(0, 20)))
-            
-            self.clouds.update()
-
-            for enemy in self.enemies.copy():
-                kill = enemy.update(self.tilemap, (0, 0))
-                if kill:
-                    self.screenshake = max(self.screen_shake_force, self.screenshake)
-                    self.enemies.remove(enemy)
-            
-            if not self.dead:
-                self.player.update(self.tilemap, 
-                                (self.movement[1] - self.movement[0], 0))
-                if self.player.air_time > self.player_fall_time_limit:
-                    if not self.dead:
-                        self.dead += 1
-                        self.screenshake = max(self.screen_shake_force, self.screenshake)
-            
-            # [[x, y], direction, timer]
-            for projectile in self.projectiles.copy():
-                projectile[0][0] += projectile[1]
-                projectile[2] += 1
-
-                if self.tilemap.solid_check(projectile[0]):
-                    self.projectiles.remove(projectile)
-                    for _ in range(4):
-                        self.sparks.append(Spark(projectile[0], 
-                                                 random.random() - 0.5 + (math.pi if projectile[1] > 0 else 0), 
-                                                 random.random() + 2))
-                elif projectile[2] > self.projectile_lifetime:
-                    self.projectiles.remove(projectile)
-                elif abs(self.player.dashing) < self.player.dash_cooldown:
-                    if self.player.rect().collidepoint(projectile[0]):
-                        self.projectiles.remove(projectile)
-                        self.dead += 1
+            self.dt = self.clock.tick(self.max_fps) / 1000
+            accumulator += self.dt
+
+            start = time.perf_counter()
+            steps = 0
+            while accumulator >= step_time and steps < self.max_catch_up \
+                    and self.running:
+                self.step()
+                accumulator -= step_time
+                steps += 1
+            accumulator = min(accumulator, step_time)
+            self.sim_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.render(accumulator / step_time)
+            self.render_time = time.perf_counter() - start
+            self.effects.measure(self.sim_time + self.render_time)
+
+        if self.recording:
+            self.recording.finish(self)
+            self.recording.save(self.record)
+
+    def step(self) -> None:
+        # One fixed step of the simulation, in phases that the replay
+        # runner times one by one.
+        self.steps += 1
+        self.update_level()
+        render_scroll = self.update_camera()
+        self.update_scenery(render_scroll)
+        self.update_enemies(render_scroll)
+        self.update_player()
+        self.update_projectiles()
+        self.update_effects()
+        self.handle_events()
+
+    def update_level(self) -> None:
+        self.screenshake = max(self.screenshake - 1, 0)
+
+        if not len(self.enemies):
+            self.transition += 1
+            if self.transition > self.transition_timer:
+                self.level = min(self.level + 1, self.level_count() - 1)
+                self.load_level(self.level)
+        if self.transition < 0:
+            self.transition += 1
+
+        if self.dead:
+            self.dead += 1
+            if self.dead >= self.restart_timer - self.transition_timer:
+                self.transition = min(self.transition + 1, 
+                                      self.transition_timer)
+            if self.dead > self.restart_timer:
+                self.load_level(self.level)
+
+    def update_camera(self) -> tuple:
+        self.prev_scroll[0] = self.scroll[0]
+        self.prev_scroll[1] = self.scroll[1]
+
+        self.scroll[0] += (self.player.rect().centerx - \
+                           self.display.get_width() / 2 - \
+                            self.scroll[0]) / self.camera_acc
+
+        self.scroll[1] += (self.player.rect().centery - \
+                           self.display.get_height() / 2 - \
+                            self.scroll[1]) / self.camera_acc
+        
+        render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
+        self.tilemap.stream(render_scroll, self.display.get_size())
+        return render_scroll
+
+    def update_scenery(self, render_scroll) -> None:
+        # Leaves only fall from trees near the camera.
+        self.leaves.focus((render_scroll, self.display.get_size()), self.steps)
+        for rect, age in self.leaves.due(self.steps):
+            pos = (rect.x + self.rng.random() * rect.width, 
+                   rect.y + self.rng.random() * rect.height)
+            self.effects.particles('leaves', 'leaf', pos, [LEAF_VELOCITY], 
+                                   [self.rng.randint(0, 20)], ages=[age])
+        
+        self.clouds.update()
+
+    def update_enemies(self, render_scroll) -> None:
+        self.broadphase.clear()
+        if self.enemy_backend == 'batch':
+            if self.enemies.update(self.tilemap):
+                self.screenshake = max(self.screen_shake_force, self.screenshake)
+        else:
+            self.enemies.focus((render_scroll, self.display.get_size()), 
+                               self.player.rect())
+            for enemy in self.enemies.active:
+                enemy.update(self.tilemap, (0, 0))
+                self.broadphase.insert('enemy', enemy, enemy.rect())
+            if abs(self.player.dashing) > self.player.dash_cooldown:
+                for enemy in self.broadphase.query(self.player.rect(), 'enemy'):
+                    if enemy.rect().colliderect(self.player.rect()):
                         self.sfx['hit'].play()
+                        enemy.dying()
                         self.screenshake = max(self.screen_shake_force, self.screenshake)
-                        for _ in range(30):
-                            angle = random.random() * math.pi * 2
-                            speed = random.random() * 5
-                            self.sparks.append(Spark(self.player.rect().center, 
-                                                     angle, 
-                                                     random.random() + 2))
-                            self.particles.append(Particle(self, 
-                                                           'particle', 
-                                                           self.player.rect().center, 
-                                                           velocity=[math.cos(angle + math.pi) * speed * 0.5, 
-                                                                     math.sin(angle + math.pi) * speed * 0.5], 
-                                                           frame=random.randint(0, 7)))
-            
-            for spark in self.sparks.copy():
-                kill = spark.update()
-                if kill:
-                    self.sparks.remove(spark)
-            
-            for particle in self.particles.copy():
-                kill = particle.update()
-                if particle.type == 'leaf':
-                    particle.pos[0] += math.sin(particle.animation.frame * 0.035) * 0.3
-                if kill:
-                    self.particles.remove(particle)
-
-            self.handle_events()
-
-            self.clouds.render(self.display_2, offset=render_scroll)
-            self.tilemap.render(self.display, offset=render_scroll)
-            
-            for enemy in self.enemies.copy():
-                enemy.render(self.display, offset=render_scroll)
-
-            if not self.dead:
-                self.player.render(self.display, offset=render_scroll)
-
-            for projectile in self.projectiles:
-                img = self.assets['projectile']
-                self.display.blit(img, 
-                                  (projectile[0][0] - img.get_width() / 2 \
-                                   - render_scroll[0], 
-                                   projectile[0][1] - img.get_height() / 2 \
-                                    - render_scroll[1]))
-            
-            for spark in self.sparks:
-                spark.render(self.display, offset=render_scroll)
-            
-            display_mask = pygame.mask.from_surface(self.display)
-            display_silhouette = display_mask.to_surface(setcolor=(0, 0, 0, 180), 
-                                                         unsetcolor=(0, 0, 0, 0))
-            for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                self.display_2.blit(display_silhouette, offset)
-                
-            for particle in self.particles:
-                particle.render(self.display, offset=render_scroll)
-
-            if self.transition:
-                transition_surf = pygame.Surface(self.display.get_size())
-                pygame.draw.circle(transition_surf, (255, 255, 255), 
-                                   (self.display.get_width() // 2, 
-                                    self.display.get_height() // 2), 
-                                   (self.transition_timer - abs(self.transition)) * 8)
-                transition_surf.set_colorkey((255, 255, 255))
-                self.display.blit(transition_surf, (0, 0))
-
-            self.display_2.blit(self.display, (0, 0))
-
-            screenshake_offset = (
-                random.random() * self.screenshake - self.screenshake / 2,
-                random.random() * self.screenshake - self.screenshake / 2
-            )
-            self.screen.blit(pygame.transform.scale(self.display_2, 
-                                                    self.screen.get_size()), 
-                                                    screenshake_offset)
+                        self.enemies.remove(enemy)
+
+    def update_player(self) -> None:
+        if not self.dead:
+            self.player.update(self.tilemap, 
+                            (self.movement[1] - self.movement[0], 0))
+            if self.player.air_time > self.player_fall_time_limit:
+                if not self.dead:
+                    self.dead += 1
+                    self.screenshake = max(self.screen_shake_force, self.screenshake)
+
+    def update_projectiles(self) -> None:
+        # Moves are swept, which keeps fast projectiles from tunneling 
+        # through thin walls.
+        for x, y, direction in self.projectiles.update(self.tilemap):
+            angles, speeds = [], []
+            for _ in range(4):
+                angles.append(self.rng.random() - 0.5 + (math.pi if direction > 0 else 0))
+                speeds.append(self.rng.random() + 2)
+            self.effects.sparks('impact', (x, y), angles, speeds)
+
+        if len(self.projectiles) and \
+                abs(self.player.dashing) < self.player.dash_cooldown:
+            hits = self.projectiles.collide_rect(self.player.rect())
+            if len(hits):
+                self.projectiles.remove(hits)
+                for _ in hits:
+                    self.dead += 1
+                    self.sfx['hit'].play()
+                    self.screenshake = max(self.screen_shake_force, self.screenshake)
+                    angles, spark_speeds = [], []
+                    velocities, frames = [], []
+                    for _ in range(30):
+                        angle = self.rng.random() * math.pi * 2
+                        speed = self.rng.random() * 5
+                        angles.append(angle)
+                        spark_speeds.append(self.rng.random() + 2)
+                        velocities.append((math.cos(angle + math.pi) * speed * 0.5, 
+                                           math.sin(angle + math.pi) * speed * 0.5))
+                        frames.append(self.rng.randint(0, 7))
+                    self.effects.particles('player_death', 'particle', 
+                                           self.player.rect().center, 
+                                           velocities, frames)
+                    self.effects.sparks('player_death', self.player.rect().center, 
+                                        angles, spark_speeds)
+
+    def update_effects(self) -> None:
+        self.sparks.update()
+        self.particles.update()
+
+    def render(self, alpha=1) -> None:
+        # alpha is how far real time is between the last two steps, and
+        # moving things are drawn that far between their two states.
+        scroll_x = self.prev_scroll[0] + (self.scroll[0] - self.prev_scroll[0]) * alpha
+        scroll_y = self.prev_scroll[1] + (self.scroll[1] - self.prev_scroll[1]) * alpha
+        render_scroll = (int(scroll_x), int(scroll_y))
+
+        self.render_world(render_scroll)
+        self.render_entities(render_scroll, alpha)
+        self.render_outline()
+        self.render_particles(render_scroll)
+        self.present()
+
+    def render_world(self, render_scroll) -> None:
+        self.display.fill((0, 0, 0, 0))
+        self.display_2.blit(self.assets['background'], (0, 0))
+
+        self.clouds.render(self.display_2, offset=render_scroll)
+        self.tilemap.enqueue(self.sprites, (*render_scroll, 
+                                            *self.display.get_size()))
+        self.outline.clear()
+        self.sprites.draw(self.display, offset=render_scroll, 
+                          outline=self.outline)
+
+    def render_entities(self, render_scroll, alpha) -> None:
+        if self.enemy_backend == 'batch':
+            self.enemies.enqueue(self.sprites, alpha)
+        else:
+            for enemy in self.enemies.active:
+                enemy.enqueue(self.sprites, alpha)
+
+        if not self.dead:
+            self.player.enqueue(self.sprites, alpha)
+        self.sprites.draw(self.display, offset=render_scroll, 
+                          outline=self.outline)
+
+        self.projectiles.render(self.display, self.assets['projectile'], 
+                                offset=render_scroll, alpha=alpha, 
+                                outline=self.outline)
+        
+        self.sparks.render(self.display, offset=render_scroll, 
+                           outline=self.outline)
+
+    def render_outline(self) -> None:
+        self.outline.render(self.display_2)
+
+    def render_particles(self, render_scroll) -> None:
+        self.particles.render(self.display, offset=render_scroll)
+
+    def present(self) -> None:
+        if self.transition:
+            transition_surf = pygame.Surface(self.display.get_size())
+            pygame.draw.circle(transition_surf, (255, 255, 255), 
+                               (self.display.get_width() // 2, 
+                                self.display.get_height() // 2), 
+                               (self.transition_timer - abs(self.transition)) * 8)
+            transition_surf.set_colorkey((255, 255, 255))
+            self.display.blit(transition_surf, (0, 0))
+
+        self.display_2.blit(self.display, (0, 0))
+
+        screenshake_offset = (
+            self.render_rng.random() * self.screenshake - self.screenshake / 2,
+            self.render_rng.random() * self.screenshake - self.screenshake / 2
+        )
+        self.screen.blit(pygame.transform.scale(self.display_2, 
+                                                self.screen.get_size()), 
+                                                screenshake_offset)
+        if not self.headless:
             pygame.display.flip()
-            self.dt = self.clock.tick(60) / 1000
 
 if __name__ == '__main__':
-    Game().run()
\ No newline at end of file
+    # python game.py [replay file to record the session into]
+    Game(record=sys.argv[1] if len(sys.argv) > 1 else None).run()
\ No newline at end of file
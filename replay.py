@@ -0,0 +1,64 @@
+import statistics
+import sys
+import time
+
+from game import Game
+from scripts.replay import load_replay, state_digest
+
+STEP_PHASES = ['update_level', 'update_camera', 'update_scenery',
+               'update_enemies', 'update_player', 'update_projectiles',
+               'update_effects']
+RENDER_PHASES = ['render_world', 'render_entities', 'render_outline',
+                 'render_particles', 'present']
+
+def time_phases(game, phases, frame_times) -> None:
+    # Wraps the phase methods of one game so that each adds its time to
+    # frame_times, which the caller reads and resets every frame.
+    for name in phases:
+        method = getattr(game, name)
+        def timed(*args, method=method, name=name):
+            start = time.perf_counter()
+            result = method(*args)
+            frame_times[name] += time.perf_counter() - start
+            return result
+        setattr(game, name, timed)
+
+def play(replay, render=True) -> tuple:
+    # Plays a replay headless, one step per frame, rendering each frame
+    # off screen unless render is off. Returns the digest of the final
+    # state and the time each phase took in every frame.
+    game = Game(enemy_backend=replay.enemy_backend, headless=True,
+                seed=replay.seed)
+    game.script = replay.script()
+
+    phases = STEP_PHASES + (RENDER_PHASES if render else [])
+    frame_times = dict.fromkeys(phases, 0)
+    time_phases(game, phases, frame_times)
+    timings = {name: [] for name in phases}
+    while game.steps < replay.steps:
+        game.step()
+        if render:
+            game.render()
+        for name in phases:
+            timings[name].append(frame_times[name])
+            frame_times[name] = 0
+    return state_digest(game), timings
+
+def report(timings) -> None:
+    frames = len(next(iter(timings.values())))
+    total = [sum(times) for times in zip(*timings.values())]
+    for name, times in list(timings.items()) + [('frame', total)]:
+        times = sorted(times)
+        print(f'{name:>18}: mean {statistics.fmean(times) * 1000:7.3f} ms  '
+              f'p95 {times[int(frames * 0.95)] * 1000:7.3f} ms  '
+              f'max {times[-1] * 1000:7.3f} ms')
+    print(f'{frames} frames, {frames / sum(total):.0f} frames/s')
+
+if __name__ == '__main__':
+    # python replay.py <replay file> [--no-render]
+    replay = load_replay(sys.argv[1])
+    digest, timings = play(replay, render='--no-render' not in sys.argv[2:])
+    report(timings)
+    if digest != replay.digest:
+        sys.exit('replay diverged from the recorded session')
+    print('replay matches the recorded session')
@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import pygame
+
+from game import MAPS_ROOT, Game
+
+# Input policies, by name so that tasks can be sent to worker processes.
+# Each one takes the rollout's seed and returns a script for
+# Game.simulate, which returns the (key, pressed) pairs for each step.
+def idle_policy(seed):
+    return lambda game: []
+
+def runner_policy(seed):
+    # Runs right and left in turns, jumping and dashing on a fixed beat.
+    def script(game):
+        events = []
+        if game.steps % 120 == 1:
+            right = (game.steps // 120) % 2 == 0
+            events += [(pygame.K_RIGHT, right), (pygame.K_LEFT, not right)]
+        if game.steps % 37 == 0:
+            events.append((pygame.K_SPACE, True))
+        if game.steps % 90 == 0:
+            events.append((pygame.K_c, True))
+        return events
+    return script
+
+def random_policy(seed):
+    # Mashes keys, with its own generator so the game's draws are unaffected.
+    rng = random.Random(seed)
+    keys = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_SPACE, pygame.K_c]
+    def script(game):
+        return [(key, rng.random() < 0.5) for key in keys if rng.random() < 0.1]
+    return script
+
+POLICIES = {
+    'idle': idle_policy,
+    'runner': runner_policy,
+    'random': random_policy,
+}
+
+def rollout_tasks(seeds, levels, policies, max_steps=3600, trail_every=60) -> list:
+    return [{'seed': seed, 'level': level, 'policy': policy,
+             'max_steps': max_steps, 'trail_every': trail_every}
+            for seed in seeds for level in levels for policy in policies]
+
+def run_rollout(task) -> dict:
+    # Plays one level headless until the player dies, the level is
+    # cleared or max_steps run out. The trail samples the player's
+    # position every trail_every steps.
+    game = Game(headless=True, seed=task['seed'])
+    game.level = task['level']
+    game.load_level(game.level)
+    game.script = POLICIES[task['policy']](task['seed'])
+
+    trail = []
+    outcome = 'timeout'
+    while game.steps < task['max_steps']:
+        game.step()
+        if game.steps % task['trail_every'] == 0:
+            trail.append(tuple(game.player.pos))
+        if game.dead:
+            outcome = 'death'
+            break
+        if not len(game.enemies):
+            outcome = 'win'
+            break
+
+    result = dict(task, outcome=outcome, steps=game.steps,
+                  pos=tuple(game.player.pos), enemies=len(game.enemies),
+                  trail=trail)
+    # pygame.init() lets SDL catch SIGTERM, which would keep the pool
+    # from ever stopping this worker.
+    pygame.quit()
+    return result
+
+def run_rollouts(tasks, processes=None, batch_size=16):
+    # Spreads rollouts over a pool of worker processes and yields their
+    # results in batches of batch_size as they finish, in any order.
+    with multiprocessing.Pool(processes) as pool:
+        batch = []
+        for result in pool.imap_unordered(run_rollout, tasks):
+            batch.append(result)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        pool.close()
+        pool.join()
+
+if __name__ == '__main__':
+    # python rollouts.py [rollouts per level and policy] [processes]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    levels = range(len([name for name in os.listdir(MAPS_ROOT)
+                        if name.endswith('.json')]))
+    tasks = rollout_tasks(range(count), levels, list(POLICIES))
+
+    outcomes = {}
+    done = 0
+    start = time.perf_counter()
+    for batch in run_rollouts(tasks, processes):
+        for result in batch:
+            key = (result['level'], result['policy'])
+            outcomes.setdefault(key, {'win': 0, 'death': 0, 'timeout': 0})
+            outcomes[key][result['outcome']] += 1
+        done += len(batch)
+        print(f'{done}/{len(tasks)} rollouts done')
+    elapsed = time.perf_counter() - start
+
+    for (level, policy), counts in sorted(outcomes.items()):
+        print(f'level {level} {policy:>7}: '
+              + '  '.join(f'{name} {n}' for name, n in counts.items()))
+    print(f'{len(tasks) / elapsed:.1f} rollouts/s')
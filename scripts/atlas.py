@@ -0,0 +1,49 @@
+import pygame
+
+from scripts.utils import DEFAULT_COLORKEY, Animation
+
+class Atlas:
+    # Packs the frames of named clips into one surface at load time, each
+    # frame next to a copy of it flipped left to right, in rows of up to
+    # max_width pixels. Frames are handed out as subsurfaces of the atlas
+    # by (clip, frame, flip), which share its pixels and colorkey, so
+    # drawing a flipped sprite neither transforms nor allocates anything.
+    def __init__(self, clips, max_width=512, colorkey=DEFAULT_COLORKEY) -> None:
+        placements = []
+        x = y = row_height = width = 0
+        for name, images in clips.items():
+            for img in images:
+                w, h = img.get_size()
+                if x and x + w * 2 > max_width:
+                    x, y, row_height = 0, y + row_height, 0
+                placements.append((name, img, (x, y)))
+                x += w * 2
+                width = max(width, x)
+                row_height = max(row_height, h)
+        height = y + row_height
+
+        # Frames keep their own pixel format, so a sprite cut from the
+        # atlas draws exactly like the image it was loaded as.
+        sample = placements[0][1]
+        self.surface = pygame.Surface((width, height), 
+                                      sample.get_flags() & pygame.SRCALPHA, sample)
+        self.surface.fill(colorkey + (0,))
+        self.surface.set_colorkey(colorkey)
+
+        self.clips = {name: [] for name in clips}
+        for name, img, (x, y) in placements:
+            w, h = img.get_size()
+            self.surface.blit(img, (x, y))
+            self.surface.blit(pygame.transform.flip(img, True, False), (x + w, y))
+            self.clips[name].append((self.surface.subsurface((x, y, w, h)),
+                                     self.surface.subsurface((x + w, y, w, h))))
+
+    def frame(self, clip, frame=0, flip=False):
+        return self.clips[clip][frame][1 if flip else 0]
+
+    def frames(self, clip, flip=False) -> list:
+        return [frames[1 if flip else 0] for frames in self.clips[clip]]
+
+    def animation(self, clip, img_dur=5, loop=True) -> Animation:
+        return Animation(self.frames(clip), img_dur=img_dur, loop=loop,
+                         flipped=self.frames(clip, flip=True))
@@ -0,0 +1,44 @@
+class SpatialHash:
+    # Uniform grid of cell_size pixel buckets that entities register in
+    # every frame, under a layer name. Queries only look at the buckets
+    # they cover and return candidates whose bounding boxes touch, in
+    # insertion order; callers still do the exact test, so the boxes are
+    # compared inclusively.
+    def __init__(self, cell_size=32) -> None:
+        self.cell_size = cell_size
+        self.clear()
+
+    def clear(self) -> None:
+        self.layers = {}
+        self.entries = []
+
+    def insert(self, layer, item, rect) -> None:
+        self.add(layer, item, rect[0], rect[1],
+                 rect[0] + rect[2], rect[1] + rect[3])
+
+    def add(self, layer, item, x0, y0, x1, y1) -> None:
+        entry = len(self.entries)
+        self.entries.append((item, x0, y0, x1, y1))
+        cells = self.layers.setdefault(layer, {})
+        for cx in range(int(x0 // self.cell_size), int(x1 // self.cell_size) + 1):
+            for cy in range(int(y0 // self.cell_size), int(y1 // self.cell_size) + 1):
+                if (cx, cy) in cells:
+                    cells[(cx, cy)].append(entry)
+                else:
+                    cells[(cx, cy)] = [entry]
+
+    def query(self, rect, layer) -> list:
+        cells = self.layers.get(layer)
+        if not cells:
+            return []
+        x0, y0 = rect[0], rect[1]
+        x1, y1 = x0 + rect[2], y0 + rect[3]
+
+        found = set()
+        for cx in range(int(x0 // self.cell_size), int(x1 // self.cell_size) + 1):
+            for cy in range(int(y0 // self.cell_size), int(y1 // self.cell_size) + 1):
+                for entry in cells.get((cx, cy), ()):
+                    box = self.entries[entry]
+                    if box[1] <= x1 and x0 <= box[3] and box[2] <= y1 and y0 <= box[4]:
+                        found.add(entry)
+        return [self.entries[entry][0] for entry in sorted(found)]
@@ -1,6 +1,8 @@
 import random
 import pygame
 
+from scripts.utils import blit_all
+
 class Cloud:
     def __init__(self, pos, img, speed, depth) -> None:
         self.pos = list(pos)
@@ -11,26 +13,26 @@ class Cloud:
     def update(self) -> None:
         self.pos[0] += self.speed
     
-    def render(self, surf, offset=(0, 0)) -> None:
+    def screen_pos(self, surf_size, offset=(0, 0)):
+        # Clouds wrap around the screen rather than sitting in the world.
         render_pos = (self.pos[0] - offset[0] * self.depth, 
                       self.pos[1] - offset[1] * self.depth)
         
-        surf.blit(self.img, 
-                  (render_pos[0] % (surf.get_width()+self.img.get_width())- \
-                   self.img.get_width(), 
-                   render_pos[1] % (surf.get_height()+self.img.get_height())- \
-                    self.img.get_height()))
+        return (render_pos[0] % (surf_size[0]+self.img.get_width())- \
+                self.img.get_width(), 
+                render_pos[1] % (surf_size[1]+self.img.get_height())- \
+                self.img.get_height())
 
 class Clouds:
-    def __init__(self, cloud_images, count=16) -> None:
+    def __init__(self, cloud_images, count=16, rng=random) -> None:
         self.clouds = []
 
         for i in range(count):
             self.clouds.append(Cloud(
-                pos=(random.random() * 99999, random.random() * 99999),
-                img=random.choice(cloud_images),
-                speed=random.random() * 0.05 + 0.05,
-                depth=random.random() * 0.6 + 0.2
+                pos=(rng.random() * 99999, rng.random() * 99999),
+                img=rng.choice(cloud_images),
+                speed=rng.random() * 0.05 + 0.05,
+                depth=rng.random() * 0.6 + 0.2
             ))
         
         self.clouds.sort(key=lambda x: x.depth)
@@ -40,5 +42,6 @@ class Clouds:
             cloud.update()
     
     def render(self, surf, offset=(0, 0)) -> None:
-        for cloud in self.clouds:
-            cloud.render(surf, offset)
\ No newline at end of file
+        surf_size = surf.get_size()
+        blit_all(surf, [(cloud.img, cloud.screen_pos(surf_size, offset)) 
+                        for cloud in self.clouds])
\ No newline at end of file
@@ -0,0 +1,136 @@
+from array import array
+
+import pygame
+
+from scripts.tilestore import CHUNK_AREA, CHUNK_MASK, CHUNK_SHIFT, CHUNK_SIZE
+
+NO_RECT = -1
+
+class CollisionGrid:
+    # Solid tiles of each chunk are merged into as few rectangles as
+    # possible (greedy runs along x, then grown along y). A per-chunk cell
+    # table maps every solid cell to its rectangle, so queries are a fixed
+    # number of array lookups whatever the size of the level. The rects
+    # around a cell are kept once worked out, so a query on a cell that
+    # was queried before is a single table lookup.
+    def __init__(self, tilemap, solid_types, neighbor_offset) -> None:
+        self.tilemap = tilemap
+        self.solid_types = solid_types
+        self.neighbor_offset = neighbor_offset
+        self.chunks = {}
+        # Per chunk, the list of rects around each of its cells, or None
+        # where that cell was not queried yet.
+        self.around = {}
+
+        # Query results are written into these and handed back to the
+        # caller, which must be done with them before the next query. A
+        # query emitting n rects returns results[n], a fixed list of the
+        # first n pooled rects, so that queries allocate nothing.
+        self.rect_pool = [pygame.Rect(0, 0, 0, 0) for _ in neighbor_offset]
+        self.results = [self.rect_pool[:n] for n in range(len(neighbor_offset) + 1)]
+        self.seen = [None] * len(neighbor_offset)
+
+    def clear(self) -> None:
+        self.chunks.clear()
+        self.around.clear()
+
+    def invalidate(self, tile_pos) -> None:
+        c_loc = (tile_pos[0] >> CHUNK_SHIFT, tile_pos[1] >> CHUNK_SHIFT)
+        self.chunks.pop(c_loc, None)
+        # Cells along the edges of the chunks around see into this one.
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                self.around.pop((c_loc[0] + dx, c_loc[1] + dy), None)
+
+    def build_chunk(self, c_loc):
+        base_x = c_loc[0] << CHUNK_SHIFT
+        base_y = c_loc[1] << CHUNK_SHIFT
+        solid = [self.tilemap.tilemap.type_at(base_x + (i & CHUNK_MASK),
+                                              base_y + (i >> CHUNK_SHIFT))
+                 in self.solid_types for i in range(CHUNK_AREA)]
+        if not any(solid):
+            return None
+
+        bounds = []
+        cells = array('h', [NO_RECT]) * CHUNK_AREA
+        for i in range(CHUNK_AREA):
+            if not solid[i] or cells[i] != NO_RECT:
+                continue
+
+            x0, y0 = i & CHUNK_MASK, i >> CHUNK_SHIFT
+            x1 = x0 + 1
+            while x1 < CHUNK_SIZE and solid[i + x1 - x0] \
+                    and cells[i + x1 - x0] == NO_RECT:
+                x1 += 1
+
+            y1 = y0 + 1
+            while y1 < CHUNK_SIZE and all(
+                    solid[(y1 << CHUNK_SHIFT) | x]
+                    and cells[(y1 << CHUNK_SHIFT) | x] == NO_RECT
+                    for x in range(x0, x1)):
+                y1 += 1
+
+            for y in range(y0, y1):
+                for x in range(x0, x1):
+                    cells[(y << CHUNK_SHIFT) | x] = len(bounds)
+            bounds.append((base_x + x0, base_y + y0, base_x + x1, base_y + y1))
+
+        return bounds, cells
+
+    def rects_around(self, tile_loc) -> list:
+        # Returns the merged rectangles touching the 3x3 tiles around
+        # tile_loc, clipped to that neighborhood so that collisions
+        # resolve exactly as they would against the individual tiles.
+        # The list and its rects are shared by every query on the cell
+        # and must not be changed.
+        x, y = tile_loc
+        c_loc = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        around = self.around.get(c_loc)
+        if around is None:
+            around = self.around[c_loc] = [None] * CHUNK_AREA
+        i = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+        rects = around[i]
+        if rects is None:
+            rects = around[i] = [rect.copy() for rect in self.merge_around(tile_loc)]
+        return rects
+
+    def merge_around(self, tile_loc) -> list:
+        tile_size = self.tilemap.tile_size
+        seen = self.seen
+        count = 0
+
+        for offset in self.neighbor_offset:
+            x = tile_loc[0] + offset[0]
+            y = tile_loc[1] + offset[1]
+            c_loc = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+            if c_loc in self.chunks:
+                chunk = self.chunks[c_loc]
+            else:
+                chunk = self.chunks[c_loc] = self.build_chunk(c_loc)
+            if chunk is None:
+                continue
+
+            rect_id = chunk[1][((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]
+            if rect_id == NO_RECT:
+                continue
+            bound = chunk[0][rect_id]
+            if bound in seen:
+                continue
+            seen[count] = bound
+
+            x0 = max(bound[0], tile_loc[0] - 1)
+            y0 = max(bound[1], tile_loc[1] - 1)
+            x1 = min(bound[2], tile_loc[0] + 2)
+            y1 = min(bound[3], tile_loc[1] + 2)
+            rect = self.rect_pool[count]
+            rect.x = x0 * tile_size
+            rect.y = y0 * tile_size
+            rect.w = (x1 - x0) * tile_size
+            rect.h = (y1 - y0) * tile_size
+            count += 1
+
+        rects = self.results[count]
+        while count:
+            count -= 1
+            seen[count] = None
+        return rects
@@ -0,0 +1,227 @@
+import math
+
+import numpy as np
+import pygame
+
+ACTIONS = ['idle', 'run']
+IDLE, RUN = 0, 1
+
+class EnemyBatch:
+    # Structure-of-arrays counterpart of a list of Enemy objects: every
+    # per-enemy field is a column and each step updates all enemies in a
+    # few vectorized passes. Collisions resolve against a SolidGrid and
+    # follow PhysicsEntity.update for enemies that start the step clear of
+    # solid tiles. Only the rare per-enemy events (shooting, dying) and
+    # rendering drop back to Python loops.
+    def __init__(self, game, positions, size=(8, 15), seed=None) -> None:
+        self.game = game
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.solid = None
+
+        count = len(positions)
+        self.pos = np.array(positions, dtype=float).reshape(count, 2)
+        self.prev_pos = self.pos.copy()
+        self.velocity = np.zeros((count, 2))
+        self.flip = np.zeros(count, dtype=bool)
+        self.walking = np.zeros(count, dtype=np.int64)
+        self.action = np.full(count, IDLE, dtype=np.int64)
+        self.frame = np.zeros(count, dtype=np.int64)
+        self.collisions = {direction: np.zeros(count, dtype=bool)
+                           for direction in ['up', 'down', 'right', 'left']}
+
+        self.anim_offset = (-3, -3)
+        self.fall_acceleration = 0.1
+        self.terminal_velocity = 5
+
+        self.wake_up_chance = 0.01
+        self.walking_speed = 0.5
+        self.walking_duration_range = (30, 120)
+        self.gun_pos = (4, 2)
+        self.shooting_range = (0, 16)
+
+        animations = [game.assets['enemy/' + action] for action in ACTIONS]
+        self.images = [animation.images for animation in animations]
+        self.flipped = [animation.flipped for animation in animations]
+        self.img_duration = np.array([animation.img_duration
+                                      for animation in animations])
+        self.anim_length = np.array([animation.img_duration * len(animation.images)
+                                     for animation in animations])
+
+    def __len__(self) -> int:
+        return len(self.pos)
+
+    def rect(self, i) -> pygame.Rect:
+        return pygame.Rect(self.pos[i][0], self.pos[i][1],
+                           self.size[0], self.size[1])
+
+    def keep(self, mask) -> None:
+        for name in ['pos', 'prev_pos', 'velocity', 'flip', 'walking', 'action', 'frame']:
+            setattr(self, name, getattr(self, name)[mask])
+        for direction in self.collisions:
+            self.collisions[direction] = self.collisions[direction][mask]
+
+    def update(self, tilemap, rolls=None, walk_durations=None) -> int:
+        # rolls and walk_durations replace the wake-up draws, one per
+        # enemy, e.g. to replay the draws of Enemy objects. Returns the
+        # number of enemies killed by the player's dash.
+        self.solid = tilemap.solid
+        self.prev_pos[:] = self.pos
+        count = len(self)
+        if not count:
+            return 0
+        if rolls is None:
+            rolls = self.rng.random(count)
+        if walk_durations is None:
+            walk_durations = self.rng.integers(self.walking_duration_range[0],
+                                               self.walking_duration_range[1] + 1,
+                                               count)
+
+        # Walkers keep going while there is ground ahead and turn around
+        # at ledges; idle enemies roll to start walking.
+        movement = np.zeros(count)
+        walking = self.walking > 0
+        center_x = np.trunc(self.pos[:, 0]) + self.size[0] // 2
+        ground = self.solid.points(center_x + np.where(self.flip, -7, 7),
+                                   self.pos[:, 1] + 23)
+        ahead = walking & ground
+        movement[ahead] = np.where(self.flip[ahead], -self.walking_speed,
+                                   self.walking_speed)
+        self.flip ^= walking & ~ground
+        self.walking[walking] -= 1
+
+        for i in np.flatnonzero(walking & (self.walking == 0)):
+            dis = (self.game.player.pos[0] - self.pos[i][0],
+                   self.game.player.pos[1] - self.pos[i][1])
+            if abs(dis[1]) < self.shooting_range[1] and \
+                tilemap.line_of_sight(self.rect(i).center,
+                                      self.game.player.rect().center):
+                self.shoot(i, dis)
+
+        wake = ~walking & (rolls < self.wake_up_chance)
+        self.walking[wake] = walk_durations[wake]
+
+        self.move(movement)
+
+        self.frame = (self.frame + 1) % self.anim_length[self.action]
+        action = np.where(movement != 0, RUN, IDLE)
+        self.frame[action != self.action] = 0
+        self.action = action
+
+        player = self.game.player
+        if abs(player.dashing) > player.dash_cooldown:
+            player_rect = player.rect()
+            x = np.trunc(self.pos[:, 0])
+            y = np.trunc(self.pos[:, 1])
+            hit = (x < player_rect.right) & (x + self.size[0] > player_rect.left) \
+                & (y < player_rect.bottom) & (y + self.size[1] > player_rect.top)
+            for i in np.flatnonzero(hit):
+                self.game.sfx['hit'].play()
+                self.dying(i)
+            if hit.any():
+                self.keep(~hit)
+            return int(hit.sum())
+        return 0
+
+    def move(self, movement) -> None:
+        # Same resolution as PhysicsEntity.update: move along x and push
+        # out of the first solid column met, then the same along y.
+        tile_size = self.solid.tile_size
+        width, height = self.size
+        frame_movement = (movement + self.velocity[:, 0], self.velocity[:, 1])
+        for direction in self.collisions.values():
+            direction[:] = False
+
+        for axis, (before, after) in enumerate([('left', 'right'),
+                                                ('up', 'down')]):
+            self.pos[:, axis] += frame_movement[axis]
+            x = np.trunc(self.pos[:, 0]).astype(np.int64)
+            y = np.trunc(self.pos[:, 1]).astype(np.int64)
+            cols = (x // tile_size, (x + width - 1) // tile_size)
+            rows = (y // tile_size, (y + height - 1) // tile_size)
+
+            if axis == 0:
+                near = self.solid.cells(cols[0], rows[0]) \
+                    | self.solid.cells(cols[0], rows[1])
+                far = self.solid.cells(cols[1], rows[0]) \
+                    | self.solid.cells(cols[1], rows[1])
+                lines, size, start = cols, width, x
+            else:
+                near = self.solid.cells(cols[0], rows[0]) \
+                    | self.solid.cells(cols[1], rows[0])
+                far = self.solid.cells(cols[0], rows[1]) \
+                    | self.solid.cells(cols[1], rows[1])
+                lines, size, start = rows, height, y
+
+            hit = near | far
+            line = np.where(near, lines[0], lines[1])
+            forward = frame_movement[axis] > 0
+            backward = frame_movement[axis] < 0
+            resolved = np.where(forward, line * tile_size - size,
+                                np.where(backward, (line + 1) * tile_size, start))
+            self.pos[:, axis] = np.where(hit, resolved, self.pos[:, axis])
+            self.collisions[after] |= hit & forward
+            self.collisions[before] |= hit & backward
+
+        self.flip = np.where(movement > 0, False,
+                             np.where(movement < 0, True, self.flip))
+
+        self.velocity[:, 1] = np.minimum(self.terminal_velocity,
+                                         self.velocity[:, 1] + self.fall_acceleration)
+        self.velocity[self.collisions['up'] | self.collisions['down'], 1] = 0
+
+    def dying(self, i) -> None:
+        center = self.rect(i).center
+        angles, spark_speeds = [], []
+        velocities, frames = [], []
+        for _ in range(30):
+            angle = self.game.rng.random() * math.pi * 2
+            speed = self.game.rng.random() * 5
+            angles.append(angle)
+            spark_speeds.append(self.game.rng.random() + 2)
+            velocities.append((math.cos(angle + math.pi) * speed * 0.5,
+                               math.sin(angle + math.pi) * speed * 0.5))
+            frames.append(self.game.rng.randint(0, 7))
+        self.game.effects.particles('enemy_death', 'particle', center,
+                                    velocities, frames)
+        angles += [0, math.pi]
+        spark_speeds += [5 + self.game.rng.random(), 5 + self.game.rng.random()]
+        self.game.effects.sparks('enemy_death', center, angles, spark_speeds)
+
+    def shoot(self, i, dis) -> None:
+        rect = self.rect(i)
+        if self.flip[i] and dis[0] < 0:
+            direction, gun_x, angle = -1.5, rect.centerx - 7, math.pi
+        elif not self.flip[i] and dis[0] > 0:
+            direction, gun_x, angle = 1.5, rect.centerx + 7, 0
+        else:
+            return
+        self.game.sfx['shoot'].play()
+        self.game.projectiles.spawn((gun_x, rect.centery), direction)
+        angles, speeds = [], []
+        for _ in range(4):
+            angles.append(self.game.rng.random() - 0.5 + angle)
+            speeds.append(2 + self.game.rng.random())
+        self.game.effects.sparks('muzzle', (gun_x, rect.centery), angles, speeds)
+
+    def enqueue(self, queue, alpha=1) -> None:
+        # Enemies are drawn alpha of the way from where they were before
+        # the last update to where they are now, like PhysicsEntity.enqueue.
+        gun = self.game.atlas.frame('gun')
+        flipped_gun = self.game.atlas.frame('gun', flip=True)
+        lag = (self.pos - self.prev_pos) * (1 - alpha)
+        for i in range(len(self)):
+            images = self.flipped if self.flip[i] else self.images
+            img = images[self.action[i]][self.frame[i] // self.img_duration[self.action[i]]]
+            queue.add(img,
+                      (self.pos[i][0] - lag[i][0] + self.anim_offset[0],
+                       self.pos[i][1] - lag[i][1] + self.anim_offset[1]))
+
+            rect = self.rect(i)
+            if self.flip[i]:
+                queue.add(flipped_gun,
+                          (rect.centerx - self.gun_pos[0] - gun.get_width() - lag[i][0],
+                           rect.centery - self.gun_pos[1] - lag[i][1]))
+            else:
+                queue.add(gun, (rect.centerx + self.gun_pos[0] - lag[i][0],
+                                rect.centery - self.gun_pos[1] - lag[i][1]))
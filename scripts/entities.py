@@ -1,25 +1,28 @@
 import math
-import random
 
 import pygame
 
-from scripts.particle import Particle
-from scripts.spark import Spark
-
 TRANSITION_DELAY = 5    # Number of frames before transitioning from a 
                         # state to another
 
 class PhysicsEntity:
+    __slots__ = ('game', 'type', 'pos', 'prev_pos', 'size', 'velocity', 
+                 'collisions', 'action', 'animation', 'animations', 
+                 'anim_offset', 'flip', 'last_movement', 'fall_acceleration', 
+                 'terminal_velocity', 'entity_rect')
+
     def __init__(self, game, e_type, pos, size) -> None:
         self.game = game
         self.type = e_type
         self.pos = list(pos)
+        self.prev_pos = list(pos)
         self.size = size
         self.velocity = [0, 0]
         self.collisions = {'up': False, 'down': False, 
                            'right': False, 'left': False}
         
         self.action = ''
+        self.animations = {}
         self.anim_offset = (-3, -3)
         self.flip = False
         self.set_action('idle')
@@ -28,45 +31,61 @@ class PhysicsEntity:
 
         self.fall_acceleration = 0.1
         self.terminal_velocity = 5
+
+        self.entity_rect = pygame.Rect(0, 0, size[0], size[1])
     
     def rect(self) -> pygame.Rect:
-        return pygame.Rect(self.pos[0], self.pos[1], 
-                           self.size[0], self.size[1])
+        # Always the same rect, moved to pos on every call: callers must 
+        # not hold on to it across a change of pos.
+        self.entity_rect.update(self.pos[0], self.pos[1], 
+                                self.size[0], self.size[1])
+        return self.entity_rect
     
     def set_action(self, action):
+        # Each action's animation is copied once and rewound on reuse.
         if action != self.action:
             self.action = action
-            self.animation = self.game.assets[self.type + '/' + self.action].copy()
+            animation = self.animations.get(action)
+            if animation is None:
+                animation = self.animations[action] = \
+                    self.game.assets[self.type + '/' + action].copy()
+            animation.frame = 0
+            animation.done = False
+            self.animation = animation
 
     def update(self, tilemap, movement=(0, 0)) -> None:
-        self.collisions = {'up': False, 'down': False, 
-                           'right': False, 'left': False}
+        self.prev_pos[0] = self.pos[0]
+        self.prev_pos[1] = self.pos[1]
+
+        collisions = self.collisions
+        collisions['up'] = collisions['down'] = False
+        collisions['right'] = collisions['left'] = False
         
-        frame_movement = (movement[0] + self.velocity[0], 
-                          movement[1] + self.velocity[1])
+        frame_x = movement[0] + self.velocity[0]
+        frame_y = movement[1] + self.velocity[1]
         
-        self.pos[0] += frame_movement[0]
+        self.pos[0] += frame_x
         entity_rect = self.rect()
         for rect in tilemap.physics_rects_around(self.pos):
             if entity_rect.colliderect(rect):
-                if frame_movement[0] > 0:
+                if frame_x > 0:
                     entity_rect.right = rect.left
-                    self.collisions['right'] = True
-                if frame_movement[0] < 0:
+                    collisions['right'] = True
+                if frame_x < 0:
                     entity_rect.left = rect.right
-                    self.collisions['left'] = True
+                    collisions['left'] = True
                 self.pos[0] = entity_rect.x
 
-        self.pos[1] += frame_movement[1]
+        self.pos[1] += frame_y
         entity_rect = self.rect()
         for rect in tilemap.physics_rects_around(self.pos):
             if entity_rect.colliderect(rect):
-                if frame_movement[1] > 0:
+                if frame_y > 0:
                     entity_rect.bottom = rect.top
-                    self.collisions['down'] = True
-                if frame_movement[1] < 0:
+                    collisions['down'] = True
+                if frame_y < 0:
                     entity_rect.top = rect.bottom
-                    self.collisions['up'] = True
+                    collisions['up'] = True
                 self.pos[1] = entity_rect.y
             
         if movement[0] > 0:
@@ -79,20 +98,31 @@ class PhysicsEntity:
         self.velocity[1] = min(self.terminal_velocity, 
                                self.velocity[1] + self.fall_acceleration)
 
-        if self.collisions['up'] or self.collisions['down']:
+        if collisions['up'] or collisions['down']:
             self.velocity[1] = 0
         
         self.animation.update()
     
-    def render(self, surf, offset=(0, 0)) -> None:
-        surf.blit(pygame.transform.flip(self.animation.img(), 
-                                        self.flip, False),
-                                        (self.pos[0] - offset[0] + \
-                                            self.anim_offset[0], 
-                                            self.pos[1] - offset[1] + \
-                                                self.anim_offset[1]))
+    def lag(self, alpha):
+        # How far behind its current position the entity is drawn, alpha
+        # of the way from where it was before its last update to where
+        # it is now.
+        return ((self.pos[0] - self.prev_pos[0]) * (1 - alpha), 
+                (self.pos[1] - self.prev_pos[1]) * (1 - alpha))
+
+    def enqueue(self, queue, alpha=1) -> None:
+        lag = self.lag(alpha)
+        queue.add(self.animation.img(self.flip),
+                  (self.pos[0] - lag[0] + self.anim_offset[0], 
+                   self.pos[1] - lag[1] + self.anim_offset[1]))
 
 class Player(PhysicsEntity):
+    __slots__ = ('air_time', 'jumps', 'remaining_jumps', 'jump_velocity', 
+                 'wall_slide', 'wall_slide_fall_velocity', 
+                 'wall_slide_impulse_velocity', 'dashing', 'dash_cooldown', 
+                 'dash_duration', 'dash_cycle', 'dash_velocity', 
+                 'dash_final_brake', 'stream_velocity', 'fall_time_limit')
+
     def __init__(self, game, pos, size) -> None:
         super().__init__(game, 'player', pos, size)
         self.air_time = 0
@@ -177,7 +207,8 @@ class Player(PhysicsEntity):
             else:
                 self.set_action('idle')
 
-        if abs(self.dashing) in {self.dash_cycle, self.dash_cooldown}:
+        if abs(self.dashing) == self.dash_cycle or \
+            abs(self.dashing) == self.dash_cooldown:
             self.burst_particles()
         
         if self.dashing > 0:
@@ -199,29 +230,30 @@ class Player(PhysicsEntity):
         elif self.velocity[0] < 0:
             self.velocity[0] = min(self.velocity[0] + 0.1, 0)
     
-    def render(self, surf, offset=(0, 0)):
+    def enqueue(self, queue, alpha=1) -> None:
         if abs(self.dashing) <= self.dash_cooldown:
-            super().render(surf, offset)
+            super().enqueue(queue, alpha)
     
     def burst_particles(self):
+        velocities, frames = [], []
         for _ in range(20):
-            angle = random.random() * math.pi * 2
-            speed = random.random() * 0.5 + 0.5
-            p_velocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-            self.game.particles.append(Particle(self.game, 'particle', 
-                                                self.rect().center, 
-                                                velocity=p_velocity,
-                                                frame=random.randint(0, 7)))
+            angle = self.game.rng.random() * math.pi * 2
+            speed = self.game.rng.random() * 0.5 + 0.5
+            velocities.append((math.cos(angle) * speed, math.sin(angle) * speed))
+            frames.append(self.game.rng.randint(0, 7))
+        self.game.effects.particles('dash', 'particle', self.rect().center, 
+                                    velocities, frames)
     
     def stream_particules(self):
-        p_velocity = [abs(self.dashing) / self.dashing \
-                      * random.random() * self.stream_velocity, 0]
-        self.game.particles.append(Particle(self.game, 'particle', 
-                                                self.rect().center, 
-                                                velocity=p_velocity,
-                                                frame=random.randint(0, 7)))
+        p_velocity = (abs(self.dashing) / self.dashing \
+                      * self.game.rng.random() * self.stream_velocity, 0)
+        self.game.effects.particles('dash', 'particle', self.rect().center, 
+                                    [p_velocity], [self.game.rng.randint(0, 7)])
 
 class Enemy(PhysicsEntity):
+    __slots__ = ('wake_up_chance', 'walking', 'walking_speed', 
+                 'walking_duration_range', 'gun_pos', 'shooting_range')
+
     def __init__(self, game, pos, size) -> None:
         super().__init__(game, 'enemy', pos, size)
         
@@ -235,12 +267,12 @@ class Enemy(PhysicsEntity):
 
         self.shooting_range = (0, 16)
 
-    def update(self, tilemap, movement=(0, 0)) -> bool:
+    def update(self, tilemap, movement=(0, 0)) -> None:
         if self.walking:
             # +/- 7 and 23 allow to check the tiles in front and below 
             # the enemy. Those can be computed from enemy and tile 
             # sizes.
-            if tilemap.solid_check((self.rect().centerx + (-7 if self.flip else 7), 
+            if tilemap.is_solid((self.rect().centerx + (-7 if self.flip else 7), 
                                     self.pos[1] + 23)):
                 movement = (movement[0] - self.walking_speed \
                             if self.flip else self.walking_speed, movement[1])
@@ -251,10 +283,12 @@ class Enemy(PhysicsEntity):
             if not self.walking:
                 dis = (self.game.player.pos[0] - self.pos[0], 
                        self.game.player.pos[1] - self.pos[1])
-                if abs(dis[1]) < self.shooting_range[1]:
+                if abs(dis[1]) < self.shooting_range[1] and \
+                    tilemap.line_of_sight(self.rect().center, 
+                                          self.game.player.rect().center):
                     self.shoot(dis)
-        elif random.random() < self.wake_up_chance:
-            self.walking = random.randint(*self.walking_duration_range)
+        elif self.game.rng.random() < self.wake_up_chance:
+            self.walking = self.game.rng.randint(*self.walking_duration_range)
 
         super().update(tilemap, movement)
 
@@ -262,63 +296,55 @@ class Enemy(PhysicsEntity):
             self.set_action('run')
         else:
             self.set_action('idle')
-        
-        if abs(self.game.player.dashing) > self.game.player.dash_cooldown:
-            if self.rect().colliderect(self.game.player.rect()):
-                self.game.sfx['hit'].play()
-                self.dying()
-                return True
             
     def dying(self):
+        angles, spark_speeds = [], []
+        velocities, frames = [], []
         for _ in range(30):
-            angle = random.random() * math.pi * 2
-            speed = random.random() * 5
-            self.game.sparks.append(Spark(self.rect().center, 
-                                        angle, 
-                                        random.random() + 2))
-            self.game.particles.append(Particle(self.game, 
-                                            'particle', 
-                                            self.rect().center, 
-                                            velocity=[math.cos(angle + math.pi) * speed * 0.5, 
-                                                        math.sin(angle + math.pi) * speed * 0.5], 
-                                            frame=random.randint(0, 7)))
-        self.game.sparks.append(Spark(self.rect().center, 0, 5 + random.random()))
-        self.game.sparks.append(Spark(self.rect().center, math.pi, 5 + random.random()))
+            angle = self.game.rng.random() * math.pi * 2
+            speed = self.game.rng.random() * 5
+            angles.append(angle)
+            spark_speeds.append(self.game.rng.random() + 2)
+            velocities.append((math.cos(angle + math.pi) * speed * 0.5, 
+                               math.sin(angle + math.pi) * speed * 0.5))
+            frames.append(self.game.rng.randint(0, 7))
+        self.game.effects.particles('enemy_death', 'particle', 
+                                    self.rect().center, velocities, frames)
+        angles += [0, math.pi]
+        spark_speeds += [5 + self.game.rng.random(), 5 + self.game.rng.random()]
+        self.game.effects.sparks('enemy_death', self.rect().center, 
+                                 angles, spark_speeds)
             
     def shoot(self, dis):
         if self.flip and dis[0] < 0:
             self.game.sfx['shoot'].play()
-            self.game.projectiles.append([[self.rect().centerx - 7, 
-                                           self.rect().centery], 
-                                          -1.5, 0])
+            gun_pos = (self.rect().centerx - 7, self.rect().centery)
+            self.game.projectiles.spawn(gun_pos, -1.5)
+            angles, speeds = [], []
             for _ in range(4):
-                self.game.sparks.append(Spark(self.game.projectiles[-1][0], 
-                                              random.random() - 0.5 + math.pi, 
-                                              2 + random.random()))
+                angles.append(self.game.rng.random() - 0.5 + math.pi)
+                speeds.append(2 + self.game.rng.random())
+            self.game.effects.sparks('muzzle', gun_pos, angles, speeds)
         if not self.flip and dis[0] > 0:
             self.game.sfx['shoot'].play()
-            self.game.projectiles.append([[self.rect().centerx + 7, 
-                                           self.rect().centery], 
-                                          1.5, 0])
+            gun_pos = (self.rect().centerx + 7, self.rect().centery)
+            self.game.projectiles.spawn(gun_pos, 1.5)
+            angles, speeds = [], []
             for _ in range(4):
-                self.game.sparks.append(Spark(self.game.projectiles[-1][0], 
-                                              random.random() - 0.5, 
-                                              2 + random.random()))
+                angles.append(self.game.rng.random() - 0.5)
+                speeds.append(2 + self.game.rng.random())
+            self.game.effects.sparks('muzzle', gun_pos, angles, speeds)
 
-    def render(self, surf, offset=(0, 0)):
-        super().render(surf, offset)
+    def enqueue(self, queue, alpha=1) -> None:
+        super().enqueue(queue, alpha)
 
+        lag = self.lag(alpha)
+        gun = self.game.atlas.frame('gun', flip=self.flip)
+        rect = self.rect()
         if self.flip:
-            surf.blit(pygame.transform.flip(self.game.assets['gun'], 
-                                            True, False), 
-                                            (self.rect().centerx \
-                                             - self.gun_pos[0] \
-                                                - self.game.assets['gun'].get_width() \
-                                                    - offset[0], 
-                                             self.rect().centery \
-                                                - self.gun_pos[1] \
-                                                    - offset[1]))
+            queue.add(gun, 
+                      (rect.centerx - self.gun_pos[0] - gun.get_width() - lag[0], 
+                       rect.centery - self.gun_pos[1] - lag[1]))
         else:
-            surf.blit(self.game.assets['gun'], 
-                      (self.rect().centerx + self.gun_pos[0] - offset[0], 
-                       self.rect().centery - self.gun_pos[1] - offset[1]))
\ No newline at end of file
+            queue.add(gun, (rect.centerx + self.gun_pos[0] - lag[0], 
+                            rect.centery - self.gun_pos[1] - lag[1]))
\ No newline at end of file
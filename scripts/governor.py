@@ -0,0 +1,105 @@
+from collections import deque
+
+# Effect categories by priority, 0 first. Lower priorities give up more
+# of their emissions as the budget shrinks.
+CATEGORIES = {
+    'player_death': 0,
+    'enemy_death': 1,
+    'impact': 2,
+    'muzzle': 2,
+    'dash': 3,
+    'leaves': 3,
+}
+PRIORITY_WEIGHTS = [0.5, 1, 1.5, 2]
+
+class EffectsGovernor:
+    # Scales how many particles and sparks get emitted, how long the
+    # particles live and how often leaves fall, from how long recent
+    # frames took to simulate and draw. The budget drops quickly while
+    # frames cost more than high of frame_budget and recovers slowly
+    # once they cost less than low of it.
+    #
+    # Effects still draw every random number they would at full budget
+    # and only emit part of what they drew, so the simulation plays out
+    # the same whatever the budget. A game that never measures a frame,
+    # like a headless one, keeps its full budget.
+    def __init__(self, game, frame_budget=1/60, window=30, high=0.9, low=0.6,
+                 min_budget=0.1) -> None:
+        self.game = game
+        self.frame_budget = frame_budget
+        self.high = high
+        self.low = low
+        self.min_budget = min_budget
+        self.frame_costs = deque(maxlen=window)
+        self.budget = 1.0
+
+        self.credit = {category: 0.0 for category in CATEGORIES}
+        self.requested = {category: 0 for category in CATEGORIES}
+        self.emitted = {category: 0 for category in CATEGORIES}
+
+    def frame_cost(self) -> float:
+        if not self.frame_costs:
+            return 0.0
+        return sum(self.frame_costs) / len(self.frame_costs)
+
+    def measure(self, frame_time) -> None:
+        # frame_time is the time a frame spent simulating and drawing,
+        # without waiting for the next one.
+        self.frame_costs.append(frame_time)
+        load = self.frame_cost() / self.frame_budget
+        if load > self.high:
+            self.budget = max(self.budget * 0.95, self.min_budget)
+        elif load < self.low:
+            self.budget = min(self.budget + 0.01, 1.0)
+
+    def scale(self, category) -> float:
+        weight = PRIORITY_WEIGHTS[CATEGORIES[category]]
+        return min(max(1 - (1 - self.budget) * weight, 0.0), 1.0)
+
+    def admit(self, category, count) -> int:
+        # How many of count effects of category to emit. Fractions carry
+        # over to the next call, so single effects like leaves are thinned
+        # to the right rate too.
+        credit = self.credit[category] + count * self.scale(category)
+        admitted = min(int(credit), count)
+        self.credit[category] = credit - admitted
+        self.requested[category] += count
+        self.emitted[category] += admitted
+        return admitted
+
+    def pick(self, category, *columns):
+        # The admitted share of columns of per-effect values, spread
+        # evenly over them.
+        count = len(columns[0])
+        admitted = self.admit(category, count)
+        if admitted == count:
+            return columns
+        picked = [i * count // admitted for i in range(admitted)]
+        return [[column[i] for i in picked] for column in columns]
+
+    def particles(self, category, p_type, pos, velocities, frames,
+                  ages=None) -> None:
+        if ages is None:
+            velocities, frames = self.pick(category, velocities, frames)
+        else:
+            velocities, frames, ages = self.pick(category, velocities, frames, ages)
+        if frames:
+            self.game.particles.emit(p_type, pos, velocities, frames,
+                                     lifetime=self.scale(category), ages=ages)
+
+    def sparks(self, category, pos, angles, speeds) -> None:
+        angles, speeds = self.pick(category, angles, speeds)
+        if angles:
+            self.game.sparks.emit(pos, angles, speeds)
+
+    def stats(self) -> dict:
+        # Current budget and, per category, its scale and how many
+        # effects were asked for and emitted so far.
+        return {
+            'budget': self.budget,
+            'frame_cost': self.frame_cost(),
+            'categories': {category: {'scale': self.scale(category),
+                                      'requested': self.requested[category],
+                                      'emitted': self.emitted[category]}
+                           for category in CATEGORIES},
+        }
@@ -0,0 +1,88 @@
+import heapq
+import math
+
+class LeafScheduler:
+    # Decides when the trees of a level drop a leaf. A tree drops one
+    # leaf a step with probability area / spawn_rate, so the waits
+    # between its leaves are drawn from an exponential distribution with
+    # that rate, and the next drop of every tree waits in a heap by step.
+    # Only trees in buckets within margin of the view are scheduled,
+    # which should be as far as a leaf gets from its tree in lifetime
+    # steps, so that leaves of other trees never reach the view. Since
+    # the waits are memoryless, a tree that comes into focus gets a fresh
+    # wait and drops leaves at the same rate as if it had been scheduled
+    # all along. The leaves it would have dropped in the last lifetime
+    # steps while it was out of focus are handed out too, already in
+    # flight, so the sky around a camera that moves on is as full as
+    # around one that stays. A step costs the drops that are due.
+    def __init__(self, spawners, spawn_rate, rng, margin=64,
+                 bucket_size=128, lifetime=0) -> None:
+        self.spawners = spawners
+        self.rates = [rect.width * rect.height / spawn_rate for rect in spawners]
+        self.rng = rng
+        self.margin = margin
+        self.bucket_size = bucket_size
+        self.lifetime = lifetime
+        self.buckets = {}
+        for i, rect in enumerate(spawners):
+            self.buckets.setdefault((rect.centerx // bucket_size,
+                                     rect.centery // bucket_size), []).append(i)
+        self.focused = set()
+        self.bounds = None
+
+        # Entries are (step, generation, spawner). A spawner that leaves
+        # the view starts a new generation, which voids its entry, and
+        # notes the step it left at.
+        self.queue = []
+        self.generation = [0] * len(spawners)
+        self.left_at = [-math.inf] * len(spawners)
+        self.in_flight = []
+
+    def focus(self, view, step) -> None:
+        # Schedules the trees near view, a (pos, size) pixel rect, from
+        # step on and drops the others. Costs next to nothing until the
+        # view crosses into other buckets.
+        (x, y), (width, height) = view
+        size = self.bucket_size
+        bounds = ((x - self.margin) // size, (y - self.margin) // size,
+                  (x + width + self.margin - 1) // size,
+                  (y + height + self.margin - 1) // size)
+        if bounds == self.bounds:
+            return
+        self.bounds = bounds
+        focused = {(bx, by) for bx in range(bounds[0], bounds[2] + 1)
+                   for by in range(bounds[1], bounds[3] + 1)}
+        for bucket in sorted(self.focused - focused):
+            for i in self.buckets.get(bucket, []):
+                self.generation[i] += 1
+                self.left_at[i] = step
+        for bucket in sorted(focused - self.focused):
+            for i in self.buckets.get(bucket, []):
+                # Going back from step, the drops missed while out of
+                # focus are as far apart as drops to come.
+                missed = min(self.lifetime, step - self.left_at[i])
+                age = self.wait(i) if missed > 0 else math.inf
+                while age < missed:
+                    self.in_flight.append((self.spawners[i], int(age)))
+                    age += self.wait(i)
+                heapq.heappush(self.queue, (step + self.wait(i),
+                                            self.generation[i], i))
+        self.focused = focused
+
+    def wait(self, i) -> float:
+        if not self.rates[i]:
+            return math.inf
+        return self.rng.expovariate(self.rates[i])
+
+    def due(self, step) -> list:
+        # (spawner rect, age) of every leaf due by step, once per leaf,
+        # where age is how many steps ago it was dropped.
+        spawned = self.in_flight
+        self.in_flight = []
+        while self.queue and self.queue[0][0] <= step:
+            due_step, generation, i = heapq.heappop(self.queue)
+            if generation != self.generation[i]:
+                continue
+            spawned.append((self.spawners[i], 0))
+            heapq.heappush(self.queue, (due_step + self.wait(i), generation, i))
+        return spawned
@@ -0,0 +1,141 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from scripts.tilestore import CHUNK_AREA, GridTileStore
+
+# Binary level layout, little endian:
+#   header      magic, version, tile_size, type count, chunk count,
+#               off-grid tile count
+#   type table  one length-prefixed utf-8 name per type id, from id 1
+#   chunk dir   (chunk x, chunk y, byte offset) per chunk
+#   off-grid    (type id, variant, x, y) per off-grid tile
+#   chunk data  CHUNK_AREA packed uint16 cells per chunk, 4-byte aligned
+LEVEL_EXT = '.lvl'
+LEVEL_MAGIC = b'DFPL'
+LEVEL_VERSION = 1
+
+HEADER = struct.Struct('<4sHHHII')
+NAME_LEN = struct.Struct('<B')
+CHUNK_ENTRY = struct.Struct('<iiI')
+OFFGRID_ENTRY = struct.Struct('<HHff')
+CHUNK_BYTES = CHUNK_AREA * 2
+
+class LevelFormatError(ValueError):
+    pass
+
+def write_level(path, tile_size, store, offgrid_tiles) -> None:
+    # Re-packing through a fresh grid store drops emptied chunks and gives
+    # off-grid types ids in the same table as on-grid ones.
+    grid = GridTileStore()
+    grid.load_json(store.to_json())
+    offgrid = [(grid.intern(tile['type']), tile['variant'],
+                tile['pos'][0], tile['pos'][1]) for tile in offgrid_tiles]
+    chunks = [(c_loc, chunk) for c_loc, chunk in grid.chunks.items()
+              if any(chunk)]
+
+    header = bytearray(HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, tile_size,
+                                   len(grid.type_names) - 1, len(chunks),
+                                   len(offgrid)))
+    for name in grid.type_names[1:]:
+        encoded = name.encode('utf-8')
+        header += NAME_LEN.pack(len(encoded)) + encoded
+
+    data_start = len(header) + CHUNK_ENTRY.size * len(chunks) \
+        + OFFGRID_ENTRY.size * len(offgrid)
+    data_start += -data_start % 4
+
+    for i, (c_loc, chunk) in enumerate(chunks):
+        header += CHUNK_ENTRY.pack(c_loc[0], c_loc[1],
+                                   data_start + i * CHUNK_BYTES)
+    for entry in offgrid:
+        header += OFFGRID_ENTRY.pack(*entry)
+    header += bytes(data_start - len(header))
+
+    with open(path, 'wb') as f:
+        f.write(header)
+        for c_loc, chunk in chunks:
+            chunk = array('H', chunk)
+            if sys.byteorder != 'little':
+                chunk.byteswap()
+            f.write(chunk.tobytes())
+
+def map_level(path, access=mmap.ACCESS_COPY) -> dict:
+    # Parses everything but the chunk data, which stays in the mapping and
+    # is located through the returned chunk directory.
+    # Files too short for what their header says, like one cut off while
+    # it was written, raise LevelFormatError too.
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise LevelFormatError(path + ' is too short for a level file')
+        mapping = mmap.mmap(f.fileno(), 0, access=access)
+
+    magic, version, tile_size, type_count, chunk_count, offgrid_count = \
+        HEADER.unpack_from(mapping, 0)
+    if magic != LEVEL_MAGIC or version != LEVEL_VERSION:
+        raise LevelFormatError(path + ' is not a version '
+                               + str(LEVEL_VERSION) + ' level file')
+    cursor = HEADER.size
+
+    type_names = [None]
+    for _ in range(type_count):
+        if cursor + NAME_LEN.size > len(mapping):
+            raise LevelFormatError(path + ' is truncated')
+        length, = NAME_LEN.unpack_from(mapping, cursor)
+        cursor += NAME_LEN.size
+        try:
+            type_names.append(mapping[cursor:cursor + length].decode('utf-8'))
+        except UnicodeDecodeError:
+            raise LevelFormatError(path + ' has a corrupt type table')
+        cursor += length
+    if cursor + CHUNK_ENTRY.size * chunk_count \
+            + OFFGRID_ENTRY.size * offgrid_count > len(mapping):
+        raise LevelFormatError(path + ' is truncated')
+
+    directory = {}
+    for cx, cy, offset in CHUNK_ENTRY.iter_unpack(
+            mapping[cursor:cursor + CHUNK_ENTRY.size * chunk_count]):
+        if offset + CHUNK_BYTES > len(mapping):
+            raise LevelFormatError(path + ' is truncated')
+        directory[(cx, cy)] = offset
+    cursor += CHUNK_ENTRY.size * chunk_count
+
+    offgrid = []
+    for type_id, variant, x, y in OFFGRID_ENTRY.iter_unpack(
+            mapping[cursor:cursor + OFFGRID_ENTRY.size * offgrid_count]):
+        if not 0 < type_id < len(type_names):
+            raise LevelFormatError(path + ' has a corrupt off-grid table')
+        offgrid.append({'type': type_names[type_id], 'variant': variant,
+                        'pos': [x, y]})
+
+    return {
+        'tile_size': tile_size,
+        'type_names': type_names,
+        'directory': directory,
+        'offgrid': offgrid,
+        'mapping': mapping,
+    }
+
+def read_chunk(mapping, offset):
+    # Copies one chunk out of the mapping.
+    chunk = array('H', mapping[offset:offset + CHUNK_BYTES])
+    if sys.byteorder != 'little':
+        chunk.byteswap()
+    return chunk
+
+def read_level(path) -> dict:
+    # Maps the file copy-on-write: chunks are memoryviews straight into
+    # the mapping, so loading creates no per-tile objects and edits never
+    # reach the file.
+    level = map_level(path)
+    view = memoryview(level['mapping'])
+    chunks = {}
+    for c_loc, offset in level['directory'].items():
+        if sys.byteorder == 'little':
+            chunks[c_loc] = view[offset:offset + CHUNK_BYTES].cast('H')
+        else:
+            chunks[c_loc] = read_chunk(level['mapping'], offset)
+    level['chunks'] = chunks
+    return level
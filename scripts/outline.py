@@ -0,0 +1,65 @@
+import weakref
+
+import pygame
+
+OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+class Outline:
+    # The dark edge drawn around everything on the display: a silhouette
+    # of what was drawn, blitted one pixel off in each direction onto the
+    # layer below. Rather than reading the whole display back into a mask
+    # every frame, whatever draws on it adds the mask of each sprite, kept
+    # per image, at the position it was blitted to. Baked tile chunks and
+    # asset images live on from frame to frame, so only images made for
+    # the frame and shapes drawn without an image cost a mask each frame.
+    # Sprites are either opaque or transparent per pixel, so the union of
+    # their masks is the mask of the display. Past max_sprites masks in a
+    # frame, reading the display back is cheaper, and the outline stops
+    # gathering and does that instead.
+    def __init__(self, layer, color=(0, 0, 0, 180), max_sprites=400) -> None:
+        self.layer = layer
+        self.color = color
+        self.max_sprites = max_sprites
+        self.mask = pygame.Mask(layer.get_size())
+        self.silhouette = pygame.Surface(layer.get_size(), pygame.SRCALPHA)
+        self.masks = weakref.WeakKeyDictionary()
+        self.sprites = 0
+
+    def mask_of(self, img):
+        # What blitting img onto a clear display would cover.
+        mask = self.masks.get(img)
+        if mask is None:
+            layer = pygame.Surface(img.get_size(), pygame.SRCALPHA)
+            layer.blit(img, (0, 0))
+            mask = self.masks[img] = pygame.mask.from_surface(layer)
+        return mask
+
+    def clear(self) -> None:
+        self.mask.clear()
+        self.sprites = 0
+
+    def add(self, blits) -> None:
+        # blits are the (image, layer position) pairs given to
+        # Surface.blits, which drops the fractions of the positions.
+        self.sprites += len(blits)
+        if self.sprites > self.max_sprites:
+            return
+        draw, mask_of = self.mask.draw, self.mask_of
+        for img, pos in blits:
+            draw(mask_of(img), (int(pos[0]), int(pos[1])))
+
+    def add_area(self, rect) -> None:
+        # For shapes drawn straight onto the layer, within rect.
+        self.sprites += 1
+        rect = rect.clip(self.layer.get_rect())
+        if rect and self.sprites <= self.max_sprites:
+            self.mask.draw(pygame.mask.from_surface(self.layer.subsurface(rect)),
+                           rect.topleft)
+
+    def render(self, surf) -> None:
+        if self.sprites > self.max_sprites:
+            self.mask = pygame.mask.from_surface(self.layer)
+        self.mask.to_surface(self.silhouette, setcolor=self.color,
+                             unsetcolor=(0, 0, 0, 0))
+        for offset in OFFSETS:
+            surf.blit(self.silhouette, offset)
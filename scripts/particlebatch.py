@@ -0,0 +1,135 @@
+import numpy as np
+
+from scripts.utils import blit_all
+
+COLUMNS = ['pos', 'velocity', 'frame', 'kind', 'done']
+
+class ParticleBatch:
+    # Structure-of-arrays counterpart of a list of Particle objects: the
+    # live particles are the first count rows of preallocated columns,
+    # which only grow when they are full. A step moves, animates and
+    # sways them in a few vectorized passes and compacts the dead ones
+    # away in place, keeping the others in the order they were emitted,
+    # which is the order they are drawn in.
+    def __init__(self, animations, sway=(), capacity=1024) -> None:
+        # animations maps each particle type to the (non looping)
+        # Animation it plays once before it dies. Types in sway drift
+        # from side to side like leaves.
+        self.types = list(animations)
+        self.images = []
+        first_image = []
+        for animation in animations.values():
+            first_image.append(len(self.images))
+            self.images += animation.images
+        self.first_image = np.array(first_image)
+        self.img_duration = np.array([animation.img_duration
+                                      for animation in animations.values()])
+        self.last_frame = np.array([animation.img_duration * len(animation.images) - 1
+                                    for animation in animations.values()])
+        self.sways = np.array([p_type in sway for p_type in self.types])
+        self.half_size = np.array([(img.get_width() // 2, img.get_height() // 2)
+                                   for img in self.images]).reshape(-1, 2)
+        self.size = np.array([img.get_size() for img in self.images]).reshape(-1, 2)
+
+        self.pos = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.frame = np.zeros(capacity, dtype=np.int64)
+        self.kind = np.zeros(capacity, dtype=np.int64)
+        self.done = np.zeros(capacity, dtype=bool)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def emit(self, p_type, pos, velocities, frames, lifetime=1, ages=None) -> None:
+        # Adds one particle per velocity and frame, all at pos or each at
+        # its own position if pos is a list of them. With a lifetime under
+        # 1 they start that much closer to the end of their animation.
+        # With ages, each starts where it would be had it been emitted
+        # that many steps ago, and is left out if it would be gone.
+        count = len(frames)
+        end = self.count + count
+        if end > len(self.pos):
+            capacity = len(self.pos)
+            while capacity < end:
+                capacity *= 2
+            for name in COLUMNS:
+                column = getattr(self, name)
+                grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+                grown[:self.count] = column[:self.count]
+                setattr(self, name, grown)
+        self.pos[self.count:end] = pos
+        self.velocity[self.count:end] = np.reshape(velocities, (count, 2))
+        kind = self.types.index(p_type)
+        self.frame[self.count:end] = frames
+        if lifetime < 1:
+            last_frame = self.last_frame[kind]
+            self.frame[self.count:end] = last_frame - \
+                ((last_frame - self.frame[self.count:end]) * lifetime).astype(np.int64)
+        self.kind[self.count:end] = kind
+        self.done[self.count:end] = False
+        self.count = end
+        if ages is not None:
+            self.age(end - count, end, np.array(ages))
+
+    def age(self, start, end, ages) -> None:
+        # Steps the last rows, start to end, on by ages steps at once and
+        # drops the ones that would have died.
+        kind = self.kind[start:end]
+        frame = self.frame[start:end]
+        last_frame = self.last_frame[kind]
+        alive = frame + ages <= last_frame
+        self.pos[start:end] += self.velocity[start:end] * ages[:, None]
+        sway = self.sways[kind]
+        if sway.any():
+            # The sway of frames frame + 1 to frame + ages, summed.
+            half_step = 0.035 / 2
+            self.pos[start:end, 0][sway] += (np.sin(ages * half_step)
+                * np.sin((frame * 2 + ages + 1) * half_step)
+                / np.sin(half_step) * 0.3)[sway]
+        np.minimum(frame + ages, last_frame, out=frame)
+        self.done[start:end] = frame >= last_frame
+        if not alive.all():
+            self.keep(np.concatenate([np.ones(start, dtype=bool), alive]))
+
+    def keep(self, mask) -> None:
+        for name in COLUMNS:
+            column = getattr(self, name)
+            kept = column[:self.count][mask]
+            column[:len(kept)] = kept
+        self.count = int(mask.sum())
+
+    def update(self) -> None:
+        # Same step as Particle.update followed by the leaf sway: a
+        # particle dies the step after its animation got done.
+        count = self.count
+        if not count:
+            return
+        kill = self.done[:count].copy()
+        self.pos[:count] += self.velocity[:count]
+
+        kind = self.kind[:count]
+        frame = self.frame[:count]
+        last_frame = self.last_frame[kind]
+        np.minimum(frame + 1, last_frame, out=frame)
+        self.done[:count] |= frame >= last_frame
+
+        sway = self.sways[kind]
+        if sway.any():
+            self.pos[:count, 0][sway] += np.sin(frame[sway] * 0.035) * 0.3
+
+        if kill.any():
+            self.keep(~kill)
+
+    def render(self, surf, offset=(0, 0)) -> None:
+        # One blit_all call for all the particles on screen.
+        count = self.count
+        kind = self.kind[:count]
+        image = self.first_image[kind] + self.frame[:count] // self.img_duration[kind]
+        x = self.pos[:count, 0] - offset[0] - self.half_size[image, 0]
+        y = self.pos[:count, 1] - offset[1] - self.half_size[image, 1]
+        size = self.size[image]
+        visible = (x > -size[:, 0]) & (x < surf.get_width()) \
+            & (y > -size[:, 1]) & (y < surf.get_height())
+        blit_all(surf, list(zip(map(self.images.__getitem__, image[visible].tolist()),
+                                np.column_stack((x[visible], y[visible])).tolist())))
@@ -0,0 +1,126 @@
+from itertools import repeat
+
+import numpy as np
+
+from scripts.utils import blit_all
+
+COLUMNS = ['pos', 'direction', 'timer']
+
+class ProjectileBatch:
+    # Projectiles in preallocated columns, the live ones in the first
+    # count rows. Spawning fills the next free row and a dead projectile
+    # is overwritten by the last live one, so the columns only grow when
+    # they are full. Each step moves and ages every projectile and sweeps
+    # the moves against a SolidGrid in a few vectorized passes.
+    def __init__(self, capacity=256, lifetime=360) -> None:
+        self.pos = np.zeros((capacity, 2))
+        self.direction = np.zeros(capacity)
+        self.timer = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+        self.lifetime = lifetime
+        self.solid = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def spawn(self, pos, direction) -> None:
+        if self.count == len(self.pos):
+            for name in COLUMNS:
+                column = getattr(self, name)
+                grown = np.zeros((len(column) * 2,) + column.shape[1:],
+                                 dtype=column.dtype)
+                grown[:self.count] = column
+                setattr(self, name, grown)
+        self.pos[self.count] = pos
+        self.direction[self.count] = direction
+        self.timer[self.count] = 0
+        self.count += 1
+
+    def remove(self, indices) -> None:
+        # Swap-remove in bulk: the live projectiles past the new end move
+        # into the holes left before it.
+        kill = np.zeros(self.count, dtype=bool)
+        kill[indices] = True
+        end = self.count - int(kill.sum())
+        holes = np.flatnonzero(kill[:end])
+        movers = np.flatnonzero(~kill[end:]) + end
+        for name in COLUMNS:
+            column = getattr(self, name)
+            column[holes] = column[movers]
+        self.count = end
+
+    def sweep(self, x, y, direction):
+        # Tilemap.segment_hit for every horizontal move at once: walks the
+        # columns the moves cross with the same float steps as raycast,
+        # so hits land on exactly the same positions. Returns which moves
+        # hit and where along x.
+        tile_size = self.solid.tile_size
+        dx = np.sign(direction)
+        reach = np.abs(direction)
+        col = np.floor_divide(x, tile_size).astype(np.int64)
+        row = np.floor_divide(y, tile_size).astype(np.int64)
+        hit = self.solid.cells(col, row)
+        hit_x = x.copy()
+        with np.errstate(divide='ignore'):
+            distance = np.where(dx != 0, ((col + (dx > 0)) * tile_size - x) / dx,
+                                np.inf)
+
+        # Only the few moves that reach another column walk on.
+        moving = np.flatnonzero(~hit & (distance <= reach))
+        col, row, distance = col[moving], row[moving], distance[moving]
+        while len(moving):
+            col += dx[moving].astype(np.int64)
+            solid = self.solid.cells(col, row)
+            stopped = moving[solid]
+            hit[stopped] = True
+            hit_x[stopped] = x[stopped] + dx[stopped] * distance[solid]
+            distance += tile_size
+            going = ~solid & (distance <= reach[moving])
+            moving, col, row, distance = \
+                moving[going], col[going], row[going], distance[going]
+        return hit, hit_x
+
+    def update(self, tilemap) -> list:
+        # Returns (x, y, direction) of the projectiles that hit a wall
+        # this step, which are gone, like the expired ones.
+        if not self.count:
+            return []
+        self.solid = tilemap.solid
+        count = self.count
+        x = self.pos[:count, 0]
+        direction = self.direction[:count]
+
+        hit, hit_x = self.sweep(x, self.pos[:count, 1], direction)
+        x += direction
+        x[hit] = hit_x[hit]
+        self.timer[:count] += 1
+
+        hits = np.column_stack((self.pos[:count][hit], direction[hit])).tolist()
+        dead = np.flatnonzero(hit | (self.timer[:count] > self.lifetime))
+        if len(dead):
+            self.remove(dead)
+        return hits
+
+    def collide_rect(self, rect):
+        # Indices of the projectiles inside rect, as Rect.collidepoint
+        # tells, which truncates positions.
+        x = np.trunc(self.pos[:self.count, 0])
+        y = np.trunc(self.pos[:self.count, 1])
+        return np.flatnonzero((x >= rect.left) & (x < rect.right)
+                              & (y >= rect.top) & (y < rect.bottom))
+
+    def render(self, surf, img, offset=(0, 0), alpha=1, outline=None) -> None:
+        # One blit_all call for all the projectiles on screen, drawn alpha
+        # of the way from their last position.
+        count = self.count
+        width, height = img.get_size()
+        x = self.pos[:count, 0] - self.direction[:count] * (1 - alpha) \
+            - width / 2 - offset[0]
+        y = self.pos[:count, 1] - height / 2 - offset[1]
+        visible = (x > -width) & (x < surf.get_width()) \
+            & (y > -height) & (y < surf.get_height())
+        blits = list(zip(repeat(img),
+                         np.column_stack((x[visible], y[visible])).tolist()))
+        blit_all(surf, blits)
+        if outline:
+            outline.add(blits)
@@ -0,0 +1,81 @@
+import pygame
+
+class ActivityRegion:
+    # Holds entities, keeping those near the camera active and parking the
+    # others as dormant in coarse buckets by position, where they are
+    # neither updated nor rendered. focus() wakes the dormant entities in
+    # the buckets around the given areas and parks active ones that
+    # wandered off, so a frame costs what is near the camera, not what
+    # the level holds. Entities must not be moved while dormant.
+    def __init__(self, entities=(), wake_margin=64, sleep_margin=128,
+                 bucket_size=128) -> None:
+        self.wake_margin = wake_margin
+        self.sleep_margin = sleep_margin
+        self.bucket_size = bucket_size
+        self.active = []
+        self.buckets = {}
+        self.dormant_count = 0
+        for entity in entities:
+            self.sleep(entity)
+
+    def __len__(self) -> int:
+        return len(self.active) + self.dormant_count
+
+    def __iter__(self):
+        yield from self.active
+        for bucket in self.buckets.values():
+            yield from bucket
+
+    def bucket_of(self, entity):
+        return (int(entity.pos[0] // self.bucket_size),
+                int(entity.pos[1] // self.bucket_size))
+
+    def sleep(self, entity) -> None:
+        self.buckets.setdefault(self.bucket_of(entity), []).append(entity)
+        self.dormant_count += 1
+
+    def wake(self, entity) -> None:
+        # Also for gameplay that reaches a dormant entity from afar.
+        bucket = self.buckets.get(self.bucket_of(entity))
+        if bucket and entity in bucket:
+            bucket.remove(entity)
+            if not bucket:
+                del self.buckets[self.bucket_of(entity)]
+            self.dormant_count -= 1
+            self.active.append(entity)
+
+    def remove(self, entity) -> None:
+        if entity in self.active:
+            self.active.remove(entity)
+            return
+        bucket = self.buckets[self.bucket_of(entity)]
+        bucket.remove(entity)
+        if not bucket:
+            del self.buckets[self.bucket_of(entity)]
+        self.dormant_count -= 1
+
+    def focus(self, *areas) -> None:
+        # areas are pixel rects to keep alive, such as the camera view and
+        # the player. Entities wake within wake_margin of one of them and
+        # only sleep again beyond sleep_margin of all of them, so that
+        # entities on the edge do not flicker between the two.
+        areas = [pygame.Rect(area) for area in areas]
+        sleep_areas = [area.inflate(self.sleep_margin * 2, self.sleep_margin * 2)
+                       for area in areas]
+        active = []
+        for entity in self.active:
+            if entity.rect().collidelist(sleep_areas) >= 0:
+                active.append(entity)
+            else:
+                self.sleep(entity)
+        self.active = active
+
+        for area in areas:
+            wake_area = area.inflate(self.wake_margin * 2, self.wake_margin * 2)
+            for bx in range(wake_area.left // self.bucket_size,
+                            (wake_area.right - 1) // self.bucket_size + 1):
+                for by in range(wake_area.top // self.bucket_size,
+                                (wake_area.bottom - 1) // self.bucket_size + 1):
+                    for entity in self.buckets.get((bx, by), []).copy():
+                        if wake_area.colliderect(entity.rect()):
+                            self.wake(entity)
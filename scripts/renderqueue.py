@@ -0,0 +1,30 @@
+from scripts.utils import blit_all
+
+class RenderQueue:
+    # Collects the sprites of one layer as (image, world position) pairs
+    # and draws them with a single blit_all call, in the order they
+    # were added, subtracting the camera offset from every position in
+    # one pass. Anything drawn straight onto the surface in between keeps
+    # its place only if the queue is drawn first. An Outline given to
+    # draw() gets the masks of the sprites.
+    def __init__(self) -> None:
+        self.items = []
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, img, pos) -> None:
+        self.items.append((img, pos))
+
+    def extend(self, items) -> None:
+        self.items.extend(items)
+
+    def draw(self, surf, offset=(0, 0), outline=None) -> None:
+        if self.items:
+            offset_x, offset_y = offset
+            blits = [(img, (x - offset_x, y - offset_y))
+                     for img, (x, y) in self.items]
+            blit_all(surf, blits)
+            if outline:
+                outline.add(blits)
+            self.items.clear()
@@ -0,0 +1,84 @@
+import hashlib
+import struct
+
+# Replay file layout, little endian:
+#   header  magic, version, enemy backend id, seed, step count, event
+#           count, digest of the final game state
+#   events  (step, key, pressed) per key press or release
+REPLAY_EXT = '.rpl'
+REPLAY_MAGIC = b'DFPR'
+REPLAY_VERSION = 4
+BACKENDS = ['objects', 'batch']
+
+HEADER = struct.Struct('<4sHBQII20s')
+EVENT = struct.Struct('<IIB')
+
+class ReplayFormatError(ValueError):
+    pass
+
+def state_digest(game) -> bytes:
+    # Covers everything the simulation carries from step to step,
+    # including the generator, so two runs that drift apart anywhere get
+    # different digests. repr keeps every bit of the floats. Particles
+    # and sparks are left out: how many of them get emitted depends on
+    # how fast the frames of the recorded session were.
+    if game.enemy_backend == 'batch':
+        enemies = game.enemies.pos.tolist()
+    else:
+        enemies = [enemy.pos for enemy in game.enemies]
+    projectiles = game.projectiles
+    state = (game.steps, game.level, game.dead, game.transition,
+             game.scroll, game.player.pos, game.player.velocity, enemies,
+             projectiles.pos[:len(projectiles)].tolist(),
+             projectiles.timer[:len(projectiles)].tolist(), game.rng.getstate())
+    return hashlib.sha1(repr(state).encode()).digest()
+
+class Replay:
+    # A recorded session: the seed of the game and every key press and
+    # release, by the step that handled it. A game with the same seed and
+    # enemy backend that is fed the same keys at the same steps plays the
+    # session again exactly, which the digest of the state it ended in
+    # lets a replay check.
+    def __init__(self, seed, enemy_backend='objects', events=None, steps=0,
+                 digest=bytes(20)) -> None:
+        self.seed = seed
+        self.enemy_backend = enemy_backend
+        self.events = events if events is not None else []
+        self.steps = steps
+        self.digest = digest
+
+    def record(self, step, key, pressed) -> None:
+        self.events.append((step, key, pressed))
+
+    def finish(self, game) -> None:
+        self.steps = game.steps
+        self.digest = state_digest(game)
+
+    def script(self):
+        # For Game.script: the keys recorded at the game's current step.
+        by_step = {}
+        for step, key, pressed in self.events:
+            by_step.setdefault(step, []).append((key, pressed))
+        return lambda game: by_step.get(game.steps, ())
+
+    def save(self, path) -> None:
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION,
+                                BACKENDS.index(self.enemy_backend), self.seed,
+                                self.steps, len(self.events), self.digest))
+            f.write(b''.join(EVENT.pack(*event) for event in self.events))
+
+def load_replay(path) -> Replay:
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ReplayFormatError(path + ' is not a replay file')
+    magic, version, backend, seed, steps, event_count, digest = \
+        HEADER.unpack_from(data, 0)
+    if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+        raise ReplayFormatError(path + ' is not a version '
+                                + str(REPLAY_VERSION) + ' replay file')
+    events = [(step, key, bool(pressed)) for step, key, pressed
+              in EVENT.iter_unpack(data[HEADER.size:
+                                        HEADER.size + EVENT.size * event_count])]
+    return Replay(seed, BACKENDS[backend], events, steps, digest)
@@ -0,0 +1,83 @@
+import numpy as np
+
+from scripts.tilestore import CHUNK_AREA, CHUNK_MASK, CHUNK_SHIFT, CHUNK_SIZE
+
+EMPTY, SOLID, UNREAD = 0, 1, 2
+
+class SolidGrid:
+    # Dense grid of the solid cells of a tilemap, for vectorized lookups.
+    # It spans the chunks of the tile store, padded with one empty chunk
+    # on every side, and lookups are clamped into it, so anything off the
+    # map is empty. Cells start out UNREAD and a chunk is only read from
+    # the store the first time a lookup lands in it, so entities never
+    # make a streamed level load chunks they don't reach.
+    def __init__(self, tilemap, solid_types) -> None:
+        self.tilemap = tilemap
+        self.solid_types = solid_types
+        self.clear()
+
+    @property
+    def tile_size(self) -> int:
+        return self.tilemap.tile_size
+
+    def clear(self) -> None:
+        # The grid is laid out again on the next lookup.
+        self.origin = None
+        self.grid = None
+
+    def layout(self) -> None:
+        locs = np.array(self.tilemap.tilemap.chunk_locs(),
+                        dtype=np.int64).reshape(-1, 2)
+        if len(locs):
+            c_origin = locs.min(axis=0) - 1
+            c_size = locs.max(axis=0) - c_origin + 2
+        else:
+            c_origin = np.zeros(2, dtype=np.int64)
+            c_size = np.ones(2, dtype=np.int64)
+        self.origin = c_origin << CHUNK_SHIFT
+        self.grid = np.full(c_size << CHUNK_SHIFT, UNREAD, dtype=np.uint8)
+        # The padding is empty from the start.
+        self.grid[:CHUNK_SIZE] = self.grid[-CHUNK_SIZE:] = EMPTY
+        self.grid[:, :CHUNK_SIZE] = self.grid[:, -CHUNK_SIZE:] = EMPTY
+
+    def invalidate(self, tile_pos) -> None:
+        if self.grid is None:
+            return
+        gx = (tile_pos[0] - self.origin[0]) & ~CHUNK_MASK
+        gy = (tile_pos[1] - self.origin[1]) & ~CHUNK_MASK
+        if CHUNK_SIZE <= gx < self.grid.shape[0] - CHUNK_SIZE \
+                and CHUNK_SIZE <= gy < self.grid.shape[1] - CHUNK_SIZE:
+            self.grid[gx:gx + CHUNK_SIZE, gy:gy + CHUNK_SIZE] = UNREAD
+        else:
+            # A chunk was added outside the grid.
+            self.clear()
+
+    def read_chunk(self, gx, gy) -> None:
+        # gx, gy is the corner of the chunk in the grid.
+        base_x, base_y = int(gx + self.origin[0]), int(gy + self.origin[1])
+        type_at = self.tilemap.tilemap.type_at
+        solid = [type_at(base_x + (i & CHUNK_MASK), base_y + (i >> CHUNK_SHIFT))
+                 in self.solid_types for i in range(CHUNK_AREA)]
+        # Cells are listed row by row, the grid is indexed [x, y].
+        self.grid[gx:gx + CHUNK_SIZE, gy:gy + CHUNK_SIZE] = \
+            np.reshape(solid, (CHUNK_SIZE, CHUNK_SIZE)).T
+
+    def cells(self, tx, ty):
+        # Solidity of tile locations, given as integer arrays.
+        if self.grid is None:
+            self.layout()
+        gx = np.clip(tx - self.origin[0], 0, self.grid.shape[0] - 1)
+        gy = np.clip(ty - self.origin[1], 0, self.grid.shape[1] - 1)
+        cells = self.grid[gx, gy]
+        unread = cells == UNREAD
+        if unread.any():
+            for corner in set(zip((gx[unread] & ~CHUNK_MASK).tolist(),
+                                  (gy[unread] & ~CHUNK_MASK).tolist())):
+                self.read_chunk(*corner)
+            cells = self.grid[gx, gy]
+        return cells == SOLID
+
+    def points(self, x, y):
+        # Solidity of the tiles under pixel positions, like solid_check.
+        return self.cells(np.floor_divide(x, self.tile_size).astype(np.int64),
+                          np.floor_divide(y, self.tile_size).astype(np.int64))
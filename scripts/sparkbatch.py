@@ -0,0 +1,142 @@
+import math
+
+import numpy as np
+import pygame
+
+from scripts.utils import blit_all
+
+COLUMNS = ['pos', 'corners', 'speed', 'heading']
+ANGLE_STEPS = 64
+SPEED_STEP = 0.25
+
+def corners(angle):
+    # Unit vectors from the middle of a spark heading at angle to the
+    # corners of its diamond, with the trig Spark.render does.
+    return [(math.cos(angle), math.sin(angle)),
+            (math.cos(angle + math.pi * 0.5), math.sin(angle + math.pi * 0.5)),
+            (math.cos(angle + math.pi), math.sin(angle + math.pi)),
+            (math.cos(angle - math.pi * 0.5), math.sin(angle - math.pi * 0.5))]
+
+class SparkBatch:
+    # Structure-of-arrays counterpart of a list of Spark objects, laid
+    # out like ParticleBatch. The direction of a spark never changes, so
+    # the unit vectors to the four corners of its diamond are worked out
+    # once when it is emitted, with the same trig calls Spark makes every
+    # frame. Moving, slowing down and building the polygons of all the
+    # sparks then take a few vectorized passes and no trig at all.
+    def __init__(self, capacity=256, color=(255, 255, 255), length=3,
+                 width=0.5, sprites=False) -> None:
+        # With sprites, sparks are drawn as pre-rasterized diamonds, one
+        # per ANGLE_STEPS heading and SPEED_STEP of speed, in a single
+        # blit_all call. That is much cheaper than a polygon per spark but
+        # snaps them to the nearest heading, speed and pixel.
+        self.color = color
+        self.length = length
+        # Corners along, left of, behind and right of the direction.
+        self.scale = np.array([length, width, length, width])[None, :, None]
+        self.sprites = sprites
+        self.sprite_cache = {}
+
+        self.pos = np.zeros((capacity, 2))
+        self.corners = np.zeros((capacity, 4, 2))
+        self.speed = np.zeros(capacity)
+        self.heading = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def emit(self, pos, angles, speeds) -> None:
+        # Adds one spark per angle and speed, all at pos or each at its
+        # own position if pos is a list of them.
+        count = len(angles)
+        end = self.count + count
+        if end > len(self.pos):
+            capacity = len(self.pos)
+            while capacity < end:
+                capacity *= 2
+            for name in COLUMNS:
+                column = getattr(self, name)
+                grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+                grown[:self.count] = column[:self.count]
+                setattr(self, name, grown)
+        self.pos[self.count:end] = pos
+        self.corners[self.count:end] = [corners(angle) for angle in angles]
+        self.speed[self.count:end] = speeds
+        self.heading[self.count:end] = [round(angle / (math.pi * 2) * ANGLE_STEPS) 
+                                        % ANGLE_STEPS for angle in angles]
+        self.count = end
+
+    def update(self) -> None:
+        # Same step as Spark.update: a spark dies once it stops.
+        count = self.count
+        if not count:
+            return
+        speed = self.speed[:count]
+        self.pos[:count] += self.corners[:count, 0] * speed[:, None]
+        np.maximum(speed - 0.1, 0, out=speed)
+
+        alive = speed != 0
+        if not alive.all():
+            for name in COLUMNS:
+                column = getattr(self, name)
+                kept = column[:count][alive]
+                column[:len(kept)] = kept
+            self.count = len(kept)
+
+    def polygons(self, offset=(0, 0)):
+        # The four screen corners of every spark, in the order they were
+        # emitted.
+        count = self.count
+        return self.pos[:count, None, :] \
+            + self.corners[:count] * self.speed[:count, None, None] * self.scale \
+            - offset
+
+    def sprite(self, key):
+        # The diamond of a spark with heading and speed step key, centred
+        # in a square extent pixels from its middle to its sides.
+        speed = key // ANGLE_STEPS * SPEED_STEP
+        extent = math.ceil(speed * self.length) + 1
+        img = pygame.Surface((extent * 2 + 1, extent * 2 + 1))
+        background = (0, 0, 0) if self.color != (0, 0, 0) else (255, 255, 255)
+        img.fill(background)
+        points = np.array(corners(key % ANGLE_STEPS * math.pi * 2 / ANGLE_STEPS)) \
+            * speed * self.scale[0] + extent
+        pygame.draw.polygon(img, self.color, points.tolist())
+        img.set_colorkey(background, pygame.RLEACCEL)
+        return img
+
+    def render_sprites(self, surf, offset=(0, 0), outline=None) -> None:
+        count = self.count
+        speed = np.rint(self.speed[:count] / SPEED_STEP)
+        extent = np.ceil(speed * SPEED_STEP * self.length) + 1
+        x = self.pos[:count, 0] - offset[0] - extent
+        y = self.pos[:count, 1] - offset[1] - extent
+        visible = (x > -extent * 2 - 1) & (x < surf.get_width()) \
+            & (y > -extent * 2 - 1) & (y < surf.get_height())
+        keys = (speed[visible].astype(np.int64) * ANGLE_STEPS 
+                + self.heading[:count][visible]).tolist()
+        for key in set(keys).difference(self.sprite_cache):
+            self.sprite_cache[key] = self.sprite(key)
+        blits = list(zip(map(self.sprite_cache.__getitem__, keys),
+                         np.column_stack((x[visible], y[visible])).tolist()))
+        blit_all(surf, blits)
+        if outline:
+            outline.add(blits)
+
+    def render_polygons(self, surf, offset=(0, 0), outline=None) -> None:
+        # Sparks a pixel or more off screen are skipped.
+        points = self.polygons(offset)
+        x, y = points[:, :, 0], points[:, :, 1]
+        visible = (x.max(axis=1) > -1) & (x.min(axis=1) < surf.get_width() + 1) \
+            & (y.max(axis=1) > -1) & (y.min(axis=1) < surf.get_height() + 1)
+        for polygon in points[visible].tolist():
+            rect = pygame.draw.polygon(surf, self.color, polygon)
+            if outline:
+                outline.add_area(rect)
+
+    def render(self, surf, offset=(0, 0), outline=None) -> None:
+        if self.sprites:
+            self.render_sprites(surf, offset, outline)
+        else:
+            self.render_polygons(surf, offset, outline)
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+import pygame
+
+from scripts.tilestore import CHUNK_SHIFT, CHUNK_SIZE
+from scripts.utils import DEFAULT_COLORKEY
+
+class ChunkCache:
+    def __init__(self, tilemap, capacity=64) -> None:
+        self.tilemap = tilemap
+        self.capacity = capacity
+        self.chunks = OrderedDict()
+
+    def clear(self) -> None:
+        self.chunks.clear()
+
+    def invalidate(self, tile_pos) -> None:
+        self.chunks.pop((tile_pos[0] >> CHUNK_SHIFT,
+                         tile_pos[1] >> CHUNK_SHIFT), None)
+
+    def get(self, c_loc):
+        if c_loc in self.chunks:
+            self.chunks.move_to_end(c_loc)
+            return self.chunks[c_loc]
+
+        baked = self.bake(c_loc)
+        self.chunks[c_loc] = baked
+        if len(self.chunks) > self.capacity:
+            self.chunks.popitem(last=False)
+        return baked
+
+    def bake(self, c_loc):
+        # Returns (surface, overflow) where overflow lists the tiles whose
+        # image does not fit in a grid cell. Those are drawn every frame
+        # so they are not clipped at the chunk border. Empty chunks bake
+        # to None. Tiles share the colorkey of scripts.utils.load_image, so
+        # a colorkeyed chunk draws exactly like its tiles would.
+        tile_size = self.tilemap.tile_size
+        assets = self.tilemap.game.assets
+        surf = None
+        overflow = []
+
+        for x in range(c_loc[0] * CHUNK_SIZE, (c_loc[0] + 1) * CHUNK_SIZE):
+            for y in range(c_loc[1] * CHUNK_SIZE, (c_loc[1] + 1) * CHUNK_SIZE):
+                tile = self.tilemap.tilemap.lookup(x, y)
+                if not tile:
+                    continue
+                img = assets[tile[0]][tile[1]]
+                if img.get_width() > tile_size or img.get_height() > tile_size:
+                    overflow.append((img, (x * tile_size, y * tile_size)))
+                    continue
+                if surf is None:
+                    surf = pygame.Surface((CHUNK_SIZE * tile_size,
+                                           CHUNK_SIZE * tile_size))
+                    surf.fill(DEFAULT_COLORKEY)
+                    surf.set_colorkey(DEFAULT_COLORKEY, pygame.RLEACCEL)
+                surf.blit(img, ((x & (CHUNK_SIZE - 1)) * tile_size,
+                                (y & (CHUNK_SIZE - 1)) * tile_size))
+
+        if surf is None and not overflow:
+            return None
+        return surf, overflow
@@ -1,7 +1,21 @@
 import json
+import math
+import os
+import struct
+import tempfile
 
 import pygame
 
+from scripts.collision import CollisionGrid
+from scripts.levelfile import (LEVEL_EXT, LevelFormatError, read_level, 
+                               write_level)
+from scripts.renderqueue import RenderQueue
+from scripts.solidgrid import SolidGrid
+from scripts.tilecache import ChunkCache
+from scripts.tilestore import (CHUNK_SHIFT, CHUNK_SIZE, DictTileStore, 
+                               GridTileStore, OffgridIndex)
+from scripts.tilestream import StreamingTileStore
+
 NEIGHBOR_OFFSET = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 0), (0, 1), 
                    (1, -1), (1, 0), (1, 1) ]
 
@@ -20,31 +34,83 @@ AUTOTILE_MAP = {
 }
 AUTOTILE_TYPES = {'grass', 'stone'}
 
+TILE_STORES = {
+    'dict': DictTileStore,
+    'grid': GridTileStore,
+    'stream': StreamingTileStore,
+}
+
+# Neighbor i contributes bit 1 << i to a tile's 4-bit neighbor mask, which
+# indexes AUTOTILE_MASKS directly (None where no variant fits).
+AUTOTILE_SHIFTS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+AUTOTILE_MASKS = [None] * (1 << len(AUTOTILE_SHIFTS))
+for neighbors, variant in AUTOTILE_MAP.items():
+    AUTOTILE_MASKS[sum(1 << AUTOTILE_SHIFTS.index(shift) 
+                       for shift in neighbors)] = variant
+
+def no_size(tile) -> tuple:
+    return (0, 0)
+
 class Tilemap:
-    def __init__(self, game, tile_size: int=16) -> None:
+    def __init__(self, game, tile_size: int=16, storage: str='grid', 
+                 offgrid_size=None) -> None:
+        # offgrid_size gives the (width, height) the off-grid index keeps
+        # for a tile, by default the size of its image in game.assets.
+        # Without a game, as in tools that only convert or inspect maps,
+        # tiles get no size and are never drawn or hit by the cursor.
         self.game = game
         self.tile_size = tile_size
-        self.tilemap = {}
-        self.offgrid_tiles = []
+        self.storage = storage
+        if offgrid_size is None:
+            offgrid_size = self.asset_size if game else no_size
+        self.offgrid_size = offgrid_size
+        self.tilemap = self.new_store()
+        self.offgrid_index = OffgridIndex()
+        self.chunk_cache = ChunkCache(self)
+        self.collision = CollisionGrid(self, PHYSICS_TILES, NEIGHBOR_OFFSET)
+        self.solid = SolidGrid(self, PHYSICS_TILES)
+        self.dirty_tiles = set()
+
+    def new_store(self):
+        store = TILE_STORES[self.storage]()
+        if isinstance(store, StreamingTileStore):
+            store.on_evict = self.drop_chunk
+        return store
+
+    def drop_chunk(self, c_loc) -> None:
+        tile_pos = (c_loc[0] << CHUNK_SHIFT, c_loc[1] << CHUNK_SHIFT)
+        self.chunk_cache.invalidate(tile_pos)
+        self.collision.invalidate(tile_pos)
+
+    def stream(self, scroll, view_size) -> None:
+        # Lets a streaming store load the chunks around the camera and
+        # drop distant ones. Other stores hold the whole level already.
+        if isinstance(self.tilemap, StreamingTileStore):
+            chunk_px = CHUNK_SIZE * self.tile_size
+            self.tilemap.focus((scroll[0] / chunk_px, scroll[1] / chunk_px, 
+                                view_size[0] / chunk_px, 
+                                view_size[1] / chunk_px))
+
+    @property
+    def offgrid_tiles(self) -> list:
+        # The off-grid index holds the tiles, in placement order.
+        return self.offgrid_index.tiles()
 
     def extract(self, id_pairs, keep=False):
         matches = []
 
-        for tile in self.offgrid_tiles.copy():
-            if (tile['type'], tile['variant']) in id_pairs:
-                matches.append(tile.copy())
-                if not keep:
-                    self.offgrid_tiles.remove(tile)
+        for tile in self.offgrid_index.matching(id_pairs):
+            matches.append(tile.copy())
+            if not keep:
+                self.remove_offgrid(tile)
         
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            if (tile['type'], tile['variant']) in id_pairs:
-                matches.append(tile.copy())
-                matches[-1]['pos'] = matches[-1]['pos'].copy()
-                matches[-1]['pos'][0] *= self.tile_size
-                matches[-1]['pos'][1] *= self.tile_size
+        for t_type, variant in id_pairs:
+            for x, y in self.tilemap.locate(t_type, variant):
+                matches.append({'type': t_type, 'variant': variant, 
+                                'pos': [x * self.tile_size, 
+                                        y * self.tile_size]})
                 if not keep:
-                    del self.tilemap['loc']
+                    self.erase((x, y))
         
         return matches
     
@@ -54,66 +120,272 @@ class Tilemap:
                     int(pos[1] // self.tile_size))
         
         for offset in NEIGHBOR_OFFSET:
-            check_loc = str(tile_loc[0] + offset[0]) + ';' \
-                + str(tile_loc[1] + offset[1])
-            if check_loc in self.tilemap:
-                tiles.append(self.tilemap[check_loc])
+            tile = self.tilemap.get(tile_loc[0] + offset[0], 
+                                    tile_loc[1] + offset[1])
+            if tile:
+                tiles.append(tile)
         
         return tiles
 
+    def place(self, tile_pos, t_type, variant) -> None:
+        if self.tilemap.lookup(tile_pos[0], tile_pos[1]) != (t_type, variant):
+            self.tilemap.set(tile_pos[0], tile_pos[1], t_type, variant)
+            self.chunk_cache.invalidate(tile_pos)
+            self.collision.invalidate(tile_pos)
+            self.solid.invalidate(tile_pos)
+            self.dirty_tiles.add((tile_pos[0], tile_pos[1]))
+
+    def erase(self, tile_pos) -> bool:
+        if self.tilemap.remove(tile_pos[0], tile_pos[1]):
+            self.chunk_cache.invalidate(tile_pos)
+            self.collision.invalidate(tile_pos)
+            self.solid.invalidate(tile_pos)
+            self.dirty_tiles.add((tile_pos[0], tile_pos[1]))
+            return True
+        return False
+
+    def asset_size(self, tile) -> tuple:
+        return self.game.assets[tile['type']][tile['variant']].get_size()
+
+    def add_offgrid(self, tile) -> None:
+        self.offgrid_index.insert(tile, self.offgrid_size(tile))
+
+    def remove_offgrid(self, tile) -> None:
+        self.offgrid_index.remove(tile)
+
+    def offgrid_in(self, rect) -> list:
+        return self.offgrid_index.query(rect)
+
+    def offgrid_at(self, pos) -> list:
+        return self.offgrid_index.query_point(pos)
+
     def save(self, path):
+        if path.endswith(LEVEL_EXT):
+            write_level(path, self.tile_size, self.tilemap, self.offgrid_tiles)
+            return
+
         with open(path, 'w') as f:
             json.dump({
-                'tilemap': self.tilemap,
+                'tilemap': self.tilemap.to_json(),
                 'tile_size': self.tile_size,
                 'offgrid': self.offgrid_tiles,
             }, f)
 
     def load(self, path):
-        with open(path, 'r') as f:
-            map_data = json.load(f)
-        
-        self.tilemap = map_data['tilemap']
-        self.tile_size = map_data['tile_size']
-        self.offgrid_tiles = map_data['offgrid']
+        self.tilemap = self.new_store()
+        if path.endswith(LEVEL_EXT) and self.storage == 'stream':
+            level = self.tilemap.open(path)
+            self.tile_size = level['tile_size']
+            offgrid_tiles = level['offgrid']
+        elif path.endswith(LEVEL_EXT):
+            level = read_level(path)
+            self.tilemap.load_chunks(level['type_names'], level['chunks'], 
+                                     level['mapping'])
+            self.tile_size = level['tile_size']
+            offgrid_tiles = level['offgrid']
+        else:
+            with open(path, 'r') as f:
+                map_data = json.load(f)
+            
+            self.tilemap.load_json(map_data['tilemap'])
+            self.tile_size = map_data['tile_size']
+            offgrid_tiles = map_data['offgrid']
+
+        self.offgrid_index.clear()
+        for tile in offgrid_tiles:
+            self.add_offgrid(tile)
+        self.chunk_cache.clear()
+        self.collision.clear()
+        self.solid.clear()
+        self.dirty_tiles.clear()
     
+    def load_cached(self, json_path) -> None:
+        # Loads a JSON map from the binary level cached next to it, which
+        # is much faster, first writing that level if it is missing,
+        # older than the map or unreadable, so edits to the map are never
+        # ignored and a bad cache never stops the map from loading.
+        # Where the cache cannot be written the map loads from JSON.
+        level_path = os.path.splitext(json_path)[0] + LEVEL_EXT
+        try:
+            fresh = os.path.getmtime(level_path) >= os.path.getmtime(json_path)
+        except OSError:
+            fresh = False
+        if fresh:
+            try:
+                self.load(level_path)
+                return
+            except (LevelFormatError, ValueError, OSError, struct.error):
+                pass
+
+        self.load(json_path)
+        # Each process writes its own temporary file, so processes loading
+        # the same map at once never read or rename a half written one.
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=os.path.basename(level_path) + '.', suffix='.tmp', 
+                dir=os.path.dirname(level_path) or '.')
+        except OSError:
+            return
+        os.close(fd)
+        try:
+            write_level(tmp_path, self.tile_size, self.tilemap, 
+                        self.offgrid_tiles)
+            os.replace(tmp_path, level_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def autotile_variant(self, x, y, t_type):
+        mask = 0
+        for i, shift in enumerate(AUTOTILE_SHIFTS):
+            if self.tilemap.type_at(x + shift[0], y + shift[1]) == t_type:
+                mask |= 1 << i
+        return AUTOTILE_MASKS[mask]
+
     def autotile(self):
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            neighbors = set()
+        # Full rebuild, for batch use.
+        for x, y, t_type, variant in self.tilemap.cells():
+            if t_type in AUTOTILE_TYPES:
+                new_variant = self.autotile_variant(x, y, t_type)
+                if new_variant is not None:
+                    self.tilemap.set_variant(x, y, new_variant)
 
-            for shift in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                check_loc = \
-                    str(tile['pos'][0] + shift[0]) + ';' + str(tile['pos'][1] + shift[1])
-                if check_loc in self.tilemap:
-                    if self.tilemap[check_loc]['type'] == tile['type']:
-                        neighbors.add(shift)
+        self.dirty_tiles.clear()
+        self.chunk_cache.clear()
 
-            neighbors = tuple(sorted(neighbors))
+    def autotile_dirty(self):
+        # Only re-resolves the tiles edited since the last pass and their
+        # 4 neighbors, which are the only ones whose mask can have changed.
+        resolve = set(self.dirty_tiles)
+        for x, y in self.dirty_tiles:
+            for shift in AUTOTILE_SHIFTS:
+                resolve.add((x + shift[0], y + shift[1]))
+        self.dirty_tiles.clear()
 
-            if tile['type'] in AUTOTILE_TYPES and neighbors in AUTOTILE_MAP:
-                tile['variant'] = AUTOTILE_MAP[neighbors]
+        for x, y in resolve:
+            tile = self.tilemap.lookup(x, y)
+            if tile and tile[0] in AUTOTILE_TYPES:
+                new_variant = self.autotile_variant(x, y, tile[0])
+                if new_variant is not None and new_variant != tile[1]:
+                    self.tilemap.set_variant(x, y, new_variant)
+                    self.chunk_cache.invalidate((x, y))
     
     def physics_rects_around(self, pos) -> list:
+        # The returned list and rects are shared and must not be changed.
+        return self.collision.rects_around((int(pos[0] // self.tile_size), 
+                                            int(pos[1] // self.tile_size)))
+
+    def tile_rects_around(self, pos) -> list:
+        # Unmerged reference path, one new rect per solid tile.
         rects = []
+        tile_loc = (int(pos[0] // self.tile_size), 
+                    int(pos[1] // self.tile_size))
 
-        for tile in self.tiles_around(pos):
-            if tile['type'] in PHYSICS_TILES:
-                rects.append(pygame.Rect(tile['pos'][0]*self.tile_size, 
-                                         tile['pos'][1]*self.tile_size,
+        for offset in NEIGHBOR_OFFSET:
+            x, y = tile_loc[0] + offset[0], tile_loc[1] + offset[1]
+            if self.tilemap.type_at(x, y) in PHYSICS_TILES:
+                rects.append(pygame.Rect(x * self.tile_size, 
+                                         y * self.tile_size,
                                          self.tile_size, self.tile_size))
         
         return rects
 
+    def is_solid(self, pos) -> bool:
+        return self.tilemap.type_at(int(pos[0] // self.tile_size), 
+                                    int(pos[1] // self.tile_size)) in PHYSICS_TILES
+
     def solid_check(self, pos):
-        tile_loc = str(int(pos[0] // self.tile_size)) + ';' + \
-            str(int(pos[1] // self.tile_size))
-        if tile_loc in self.tilemap:
-            if self.tilemap[tile_loc]['type'] in PHYSICS_TILES:
-                return self.tilemap[tile_loc]
+        # The (type, variant) of the solid tile under pos, if any. Reads the
+        # packed cell rather than building a tile dict.
+        tile = self.tilemap.lookup(int(pos[0] // self.tile_size), 
+                                   int(pos[1] // self.tile_size))
+        if tile and tile[0] in PHYSICS_TILES:
+            return tile
+
+    def raycast(self, origin, direction, max_distance):
+        # Walks the grid cell by cell along the ray (DDA) and returns the 
+        # first solid hit within max_distance, as a dict with the hit 
+        # 'pos', the surface 'normal', the 'tile' location and the 
+        # 'distance' travelled. A ray starting inside a solid tile hits 
+        # at distance 0 with a (0, 0) normal.
+        length = math.hypot(direction[0], direction[1])
+        dx, dy = (direction[0] / length, direction[1] / length) \
+            if length else (0, 0)
+
+        x = int(origin[0] // self.tile_size)
+        y = int(origin[1] // self.tile_size)
+        normal = (0, 0)
+        distance = 0
+
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        delta_x = self.tile_size / abs(dx) if dx else math.inf
+        delta_y = self.tile_size / abs(dy) if dy else math.inf
+        next_x = ((x + (dx > 0)) * self.tile_size - origin[0]) / dx \
+            if dx else math.inf
+        next_y = ((y + (dy > 0)) * self.tile_size - origin[1]) / dy \
+            if dy else math.inf
+
+        while distance <= max_distance:
+            if self.tilemap.type_at(x, y) in PHYSICS_TILES:
+                return {'pos': [origin[0] + dx * distance, 
+                                 origin[1] + dy * distance], 
+                        'normal': normal, 
+                        'tile': (x, y), 
+                        'distance': distance}
+
+            if next_x < next_y:
+                distance = next_x
+                next_x += delta_x
+                x += step_x
+                normal = (-step_x, 0)
+            else:
+                distance = next_y
+                next_y += delta_y
+                y += step_y
+                normal = (0, -step_y)
+
+        return None
+
+    def segment_hit(self, start, end):
+        # First solid hit on the segment from start to end, or None.
+        return self.raycast(start, (end[0] - start[0], end[1] - start[1]), 
+                            math.hypot(end[0] - start[0], end[1] - start[1]))
+
+    def line_of_sight(self, start, end) -> bool:
+        return self.segment_hit(start, end) is None
     
+    def enqueue(self, queue, view) -> None:
+        # Queues the tiles seen through view, an (x, y, width, height)
+        # rectangle of the world, at their world positions.
+        assets = self.game.assets
+        queue.extend([(assets[tile['type']][tile['variant']], tile['pos']) 
+                      for tile in self.offgrid_in(view)])
+        
+        # On-grid tiles never move during play, so they are baked into
+        # chunk surfaces and drawn one chunk at a time.
+        chunk_px = CHUNK_SIZE * self.tile_size
+        overflow = []
+        for cx in range(view[0] // chunk_px, (view[0]+view[2]) // chunk_px + 1):
+            for cy in range(view[1] // chunk_px, (view[1]+view[3]) // chunk_px + 1):
+                baked = self.chunk_cache.get((cx, cy))
+                if baked:
+                    if baked[0]:
+                        queue.add(baked[0], (cx*chunk_px, cy*chunk_px))
+                    overflow.extend(baked[1])
+
+        queue.extend(overflow)
+
     def render(self, surf, offset=(0, 0)) -> None:
-        # Following for loop can be optimized
+        queue = RenderQueue()
+        self.enqueue(queue, (offset[0], offset[1], 
+                             surf.get_width(), surf.get_height()))
+        queue.draw(surf, offset)
+
+    def render_tiles(self, surf, offset=(0, 0)) -> None:
+        # Unbaked reference path, drawing every visible tile on its own.
         for tile in self.offgrid_tiles:
             surf.blit(self.game.assets[tile['type']][tile['variant']], 
                       (tile['pos'][0]-offset[0], tile['pos'][1]-offset[1]))
@@ -122,17 +394,8 @@ class Tilemap:
                        (offset[0]+surf.get_width()) // self.tile_size + 1):
             for y in range(offset[1] // self.tile_size, 
                            (offset[1]+surf.get_height()) // self.tile_size + 1):
-                loc = str(x) + ';' + str(y)
-                if loc in self.tilemap:
-                    tile = self.tilemap[loc]
-                    surf.blit(self.game.assets[tile['type']][tile['variant']], 
-                              (tile['pos'][0]*self.tile_size-offset[0], 
-                               tile['pos'][1]*self.tile_size-offset[1]))
-
-        
-        
-        #for loc in self.tilemap:
-        #    tile = self.tilemap[loc]
-        #    surf.blit(self.game.assets[tile['type']][tile['variant']], 
-        #              (tile['pos'][0]*self.tile_size-offset[0], 
-        #               tile['pos'][1]*self.tile_size-offset[1]))
\ No newline at end of file
+                tile = self.tilemap.lookup(x, y)
+                if tile:
+                    surf.blit(self.game.assets[tile[0]][tile[1]], 
+                              (x*self.tile_size-offset[0], 
+                               y*self.tile_size-offset[1]))
\ No newline at end of file
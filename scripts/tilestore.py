@@ -0,0 +1,312 @@
+from array import array
+
+CHUNK_SHIFT = 4                 # Chunks are 2**CHUNK_SHIFT tiles wide
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+CHUNK_AREA = CHUNK_SIZE * CHUNK_SIZE
+
+VARIANT_BITS = 8                # A grid cell packs (type_id << 8) | variant
+VARIANT_MASK = (1 << VARIANT_BITS) - 1
+
+EMPTY = 0                       # Type id 0 is reserved for empty cells
+
+OFFGRID_BUCKET_SIZE = 64        # Side of an off-grid index bucket, in pixels
+
+
+def loc_key(x, y) -> str:
+    return str(x) + ';' + str(y)
+
+
+class DictTileStore:
+    # Legacy storage: one dict per tile, indexed by 'x;y' strings exactly
+    # as in the map files.
+    def __init__(self) -> None:
+        self.tiles = {}
+        self.index = {}
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def get(self, x, y):
+        return self.tiles.get(str(x) + ';' + str(y))
+
+    def type_at(self, x, y):
+        tile = self.tiles.get(str(x) + ';' + str(y))
+        if tile:
+            return tile['type']
+
+    def lookup(self, x, y):
+        tile = self.tiles.get(str(x) + ';' + str(y))
+        if tile:
+            return tile['type'], tile['variant']
+
+    def set(self, x, y, t_type, variant) -> None:
+        self.remove(x, y)
+        tile = {'type': t_type, 'variant': variant, 'pos': [x, y]}
+        self.tiles[str(x) + ';' + str(y)] = tile
+        self.index.setdefault((t_type, variant), {})[(x, y)] = tile
+
+    def set_variant(self, x, y, variant) -> None:
+        self.set(x, y, self.tiles[str(x) + ';' + str(y)]['type'], variant)
+
+    def remove(self, x, y) -> bool:
+        tile = self.tiles.pop(str(x) + ';' + str(y), None)
+        if tile is None:
+            return False
+        del self.index[(tile['type'], tile['variant'])][(x, y)]
+        return True
+
+    def locate(self, t_type, variant) -> list:
+        return list(self.index.get((t_type, variant), ()))
+
+    def chunk_locs(self) -> list:
+        return list({(int(tile['pos'][0]) >> CHUNK_SHIFT, 
+                      int(tile['pos'][1]) >> CHUNK_SHIFT) 
+                     for tile in self.tiles.values()})
+
+    def cells(self):
+        for tile in list(self.tiles.values()):
+            yield tile['pos'][0], tile['pos'][1], tile['type'], tile['variant']
+
+    def load_json(self, tiles) -> None:
+        self.tiles = tiles
+        self.index = {}
+        for tile in tiles.values():
+            self.index.setdefault((tile['type'], tile['variant']), {})[
+                (tile['pos'][0], tile['pos'][1])] = tile
+
+    def load_chunks(self, type_names, chunks, mapping=None) -> None:
+        grid = GridTileStore()
+        grid.load_chunks(type_names, chunks, mapping)
+        self.load_json(grid.to_json())
+
+    def to_json(self) -> dict:
+        return self.tiles
+
+
+class GridTileStore:
+    # Dense storage: the map is cut into CHUNK_SIZE x CHUNK_SIZE chunks,
+    # each one a flat array of packed (type_id, variant) cells. Type names
+    # are interned per store so lookups never build strings.
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.chunks = {}
+        self.type_names = [None]
+        self.type_ids = {}
+        self.count = 0
+        self.mapping = None
+        # Packed value -> chunks that may hold it, None until first needed.
+        self.value_chunks = {}
+
+    def __len__(self) -> int:
+        if self.count is None:
+            self.count = sum(CHUNK_AREA - chunk.tolist().count(EMPTY)
+                             for chunk in self.chunks.values())
+        return self.count
+
+    def intern(self, t_type) -> int:
+        if t_type not in self.type_ids:
+            self.type_ids[t_type] = len(self.type_names)
+            self.type_names.append(t_type)
+        return self.type_ids[t_type]
+
+    def value_at(self, x, y) -> int:
+        chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None:
+            return EMPTY
+        return chunk[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]
+
+    def get(self, x, y):
+        value = self.value_at(x, y)
+        if value:
+            return {'type': self.type_names[value >> VARIANT_BITS],
+                    'variant': value & VARIANT_MASK,
+                    'pos': [x, y]}
+
+    def type_at(self, x, y):
+        value = self.value_at(x, y)
+        if value:
+            return self.type_names[value >> VARIANT_BITS]
+
+    def lookup(self, x, y):
+        value = self.value_at(x, y)
+        if value:
+            return self.type_names[value >> VARIANT_BITS], value & VARIANT_MASK
+
+    def set(self, x, y, t_type, variant) -> None:
+        c_loc = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        chunk = self.chunks.get(c_loc)
+        if chunk is None:
+            chunk = self.chunks[c_loc] = array('H', bytes(2 * CHUNK_AREA))
+        i = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+        if not chunk[i] and self.count is not None:
+            self.count += 1
+        chunk[i] = (self.intern(t_type) << VARIANT_BITS) | variant
+        if self.value_chunks is not None:
+            self.value_chunks.setdefault(chunk[i], set()).add(c_loc)
+
+    def set_variant(self, x, y, variant) -> None:
+        c_loc = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        chunk = self.chunks[c_loc]
+        i = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+        chunk[i] = (chunk[i] & ~VARIANT_MASK) | variant
+        if self.value_chunks is not None:
+            self.value_chunks.setdefault(chunk[i], set()).add(c_loc)
+
+    def remove(self, x, y) -> bool:
+        chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None:
+            return False
+        i = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+        if not chunk[i]:
+            return False
+        chunk[i] = EMPTY
+        if self.count is not None:
+            self.count -= 1
+        return True
+
+    def chunk_locs(self) -> list:
+        return list(self.chunks)
+
+    def scan_chunk(self, c_loc):
+        return self.chunks.get(c_loc)
+
+    def locate(self, t_type, variant) -> list:
+        # Only scans the chunks known to hold the packed value. Removals
+        # leave stale chunks behind, which the scan simply finds empty.
+        if t_type not in self.type_ids:
+            return []
+        if self.value_chunks is None:
+            self.value_chunks = {}
+            for c_loc in self.chunk_locs():
+                for value in set(self.scan_chunk(c_loc)):
+                    self.value_chunks.setdefault(value, set()).add(c_loc)
+
+        value = (self.type_ids[t_type] << VARIANT_BITS) | variant
+        found = []
+        for c_loc in self.value_chunks.get(value, ()):
+            chunk = self.scan_chunk(c_loc)
+            for i, cell in enumerate(chunk):
+                if cell == value:
+                    found.append(((c_loc[0] << CHUNK_SHIFT) | (i & CHUNK_MASK),
+                                  (c_loc[1] << CHUNK_SHIFT) | (i >> CHUNK_SHIFT)))
+        return found
+
+    def cells(self):
+        for (cx, cy), chunk in list(self.chunks.items()):
+            for i, value in enumerate(chunk):
+                if value:
+                    yield (cx << CHUNK_SHIFT) | (i & CHUNK_MASK), \
+                        (cy << CHUNK_SHIFT) | (i >> CHUNK_SHIFT), \
+                        self.type_names[value >> VARIANT_BITS], \
+                        value & VARIANT_MASK
+
+    def load_json(self, tiles) -> None:
+        self.clear()
+        for tile in tiles.values():
+            self.set(int(tile['pos'][0]), int(tile['pos'][1]),
+                     tile['type'], tile['variant'])
+
+    def load_chunks(self, type_names, chunks, mapping=None) -> None:
+        # Adopts packed chunks as they are, e.g. memoryviews into a mapped
+        # level file kept alive through mapping. The tile count is only
+        # computed if asked for.
+        self.clear()
+        self.type_names = list(type_names)
+        self.type_ids = {name: i for i, name in enumerate(type_names) if i}
+        self.chunks = dict(chunks)
+        self.mapping = mapping
+        self.count = None
+        self.value_chunks = None
+
+    def to_json(self) -> dict:
+        tiles = {}
+        for x, y, t_type, variant in self.cells():
+            tiles[loc_key(x, y)] = {'type': t_type, 'variant': variant,
+                                    'pos': [x, y]}
+        return tiles
+
+
+class OffgridIndex:
+    # Uniform bucket grid over the bounding boxes of off-grid tiles. A tile
+    # is registered in every bucket its box overlaps; queries return tiles
+    # in insertion order so overlapping decor keeps its draw order.
+    def __init__(self, bucket_size=OFFGRID_BUCKET_SIZE) -> None:
+        self.bucket_size = bucket_size
+        self.buckets = {}
+        self.entries = {}
+        self.by_id = {}
+        self.next_order = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def clear(self) -> None:
+        self.buckets.clear()
+        self.entries.clear()
+        self.by_id.clear()
+        self.next_order = 0
+
+    def tiles(self) -> list:
+        return [entry[1] for entry in self.entries.values()]
+
+    def bucket_range(self, rect):
+        return (range(int(rect[0] // self.bucket_size),
+                      int((rect[0] + rect[2]) // self.bucket_size) + 1),
+                range(int(rect[1] // self.bucket_size),
+                      int((rect[1] + rect[3]) // self.bucket_size) + 1))
+
+    def insert(self, tile, size) -> None:
+        entry = (self.next_order, tile,
+                 (tile['pos'][0], tile['pos'][1], size[0], size[1]))
+        self.next_order += 1
+        self.entries[id(tile)] = entry
+        self.by_id.setdefault((tile['type'], tile['variant']), {})[id(tile)] = entry
+
+        bx_range, by_range = self.bucket_range(entry[2])
+        for bx in bx_range:
+            for by in by_range:
+                self.buckets.setdefault((bx, by), []).append(entry)
+
+    def remove(self, tile) -> bool:
+        entry = self.entries.pop(id(tile), None)
+        if entry is None:
+            return False
+        del self.by_id[(tile['type'], tile['variant'])][id(tile)]
+
+        bx_range, by_range = self.bucket_range(entry[2])
+        for bx in bx_range:
+            for by in by_range:
+                bucket = self.buckets[(bx, by)]
+                bucket.remove(entry)
+                if not bucket:
+                    del self.buckets[(bx, by)]
+        return True
+
+    def matching(self, id_pairs) -> list:
+        entries = []
+        for id_pair in id_pairs:
+            entries.extend(self.by_id.get(id_pair, {}).values())
+        return [entry[1] for entry in sorted(entries, key=lambda e: e[0])]
+
+    def query(self, rect) -> list:
+        found = {}
+        bx_range, by_range = self.bucket_range(rect)
+        for bx in bx_range:
+            for by in by_range:
+                for entry in self.buckets.get((bx, by), ()):
+                    box = entry[2]
+                    if box[0] < rect[0] + rect[2] and rect[0] < box[0] + box[2] \
+                            and box[1] < rect[1] + rect[3] \
+                            and rect[1] < box[1] + box[3]:
+                        found[entry[0]] = entry[1]
+        return [found[order] for order in sorted(found)]
+
+    def query_point(self, pos) -> list:
+        bucket = self.buckets.get((int(pos[0] // self.bucket_size),
+                                   int(pos[1] // self.bucket_size)), ())
+        return [entry[1] for entry in bucket
+                if entry[2][0] <= pos[0] < entry[2][0] + entry[2][2]
+                and entry[2][1] <= pos[1] < entry[2][1] + entry[2][3]]
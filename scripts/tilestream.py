@@ -0,0 +1,139 @@
+import mmap
+from collections import OrderedDict
+
+from scripts.levelfile import map_level, read_chunk
+from scripts.tilestore import (CHUNK_MASK, CHUNK_SHIFT, EMPTY, VARIANT_BITS,
+                               VARIANT_MASK, GridTileStore)
+
+class StreamingTileStore(GridTileStore):
+    # Grid store backed by a level file. Chunks are copied out of the file
+    # when first touched, the ones around the camera are prefetched by
+    # focus(), and the least recently used ones beyond max_chunks are
+    # dropped again. Edited chunks and chunks that did not come from a
+    # file are pinned in memory.
+    def __init__(self, max_chunks=64, margin=1, prefetch=2) -> None:
+        self.max_chunks = max_chunks
+        self.margin = margin
+        self.prefetch = prefetch
+        self.on_evict = None
+        super().__init__()
+
+    def clear(self) -> None:
+        super().clear()
+        self.chunks = OrderedDict()
+        self.directory = {}
+        self.pinned = set()
+        self.last_focus = None
+        self.loads = 0
+        self.evictions = 0
+
+    def open(self, path) -> dict:
+        level = map_level(path, access=mmap.ACCESS_READ)
+        self.clear()
+        self.type_names = list(level['type_names'])
+        self.type_ids = {name: i for i, name in enumerate(self.type_names) if i}
+        self.directory = level['directory']
+        self.mapping = level['mapping']
+        self.count = None
+        self.value_chunks = None
+        return level
+
+    def chunk(self, c_loc):
+        chunk = self.chunks.get(c_loc)
+        if chunk is None and c_loc in self.directory:
+            chunk = self.chunks[c_loc] = read_chunk(self.mapping,
+                                                    self.directory[c_loc])
+            self.loads += 1
+        return chunk
+
+    def value_at(self, x, y) -> int:
+        chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None:
+            chunk = self.chunk((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+            if chunk is None:
+                return EMPTY
+        return chunk[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]
+
+    def set(self, x, y, t_type, variant) -> None:
+        c_loc = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        self.chunk(c_loc)
+        self.pinned.add(c_loc)
+        super().set(x, y, t_type, variant)
+
+    def set_variant(self, x, y, variant) -> None:
+        c_loc = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        self.chunk(c_loc)
+        self.pinned.add(c_loc)
+        super().set_variant(x, y, variant)
+
+    def remove(self, x, y) -> bool:
+        c_loc = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        if self.chunk(c_loc) is None:
+            return False
+        self.pinned.add(c_loc)
+        return super().remove(x, y)
+
+    def chunk_locs(self) -> list:
+        return list(self.directory.keys() | self.chunks.keys())
+
+    def scan_chunk(self, c_loc):
+        # Reads a chunk without making it resident.
+        chunk = self.chunks.get(c_loc)
+        if chunk is None:
+            chunk = read_chunk(self.mapping, self.directory[c_loc])
+        return chunk
+
+    def cells(self):
+        # Walks the whole level without making every chunk resident.
+        for c_loc in self.chunk_locs():
+            chunk = self.scan_chunk(c_loc)
+            for i, value in enumerate(chunk):
+                if value:
+                    yield (c_loc[0] << CHUNK_SHIFT) | (i & CHUNK_MASK), \
+                        (c_loc[1] << CHUNK_SHIFT) | (i >> CHUNK_SHIFT), \
+                        self.type_names[value >> VARIANT_BITS], \
+                        value & VARIANT_MASK
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.cells())
+
+    def focus(self, area) -> None:
+        # area is the camera view (x, y, width, height) in chunk units.
+        x0 = int(area[0] // 1) - self.margin
+        y0 = int(area[1] // 1) - self.margin
+        x1 = int((area[0] + area[2]) // 1) + self.margin
+        y1 = int((area[1] + area[3]) // 1) + self.margin
+
+        if self.last_focus:
+            if area[0] > self.last_focus[0]:
+                x1 += self.prefetch
+            elif area[0] < self.last_focus[0]:
+                x0 -= self.prefetch
+            if area[1] > self.last_focus[1]:
+                y1 += self.prefetch
+            elif area[1] < self.last_focus[1]:
+                y0 -= self.prefetch
+        self.last_focus = area
+
+        wanted = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                if self.chunk((cx, cy)) is not None:
+                    self.chunks.move_to_end((cx, cy))
+                    wanted.add((cx, cy))
+
+        self.evict(wanted)
+
+    def evict(self, keep) -> None:
+        excess = len(self.chunks) - len(self.pinned) - self.max_chunks
+        for c_loc in list(self.chunks):
+            if excess <= 0:
+                break
+            if c_loc in keep or c_loc in self.pinned \
+                    or c_loc not in self.directory:
+                continue
+            del self.chunks[c_loc]
+            self.evictions += 1
+            excess -= 1
+            if self.on_evict:
+                self.on_evict(c_loc)
@@ -6,7 +6,10 @@ BASE_IMAGE_PATH = 'data/images/'
 DEFAULT_COLORKEY = (0, 0, 0)
 
 def load_image(path, colorkey=DEFAULT_COLORKEY):
-    img = pygame.image.load(BASE_IMAGE_PATH + path).convert()
+    img = pygame.image.load(BASE_IMAGE_PATH + path)
+    # Without a window (headless runs) images keep their file format.
+    if pygame.display.get_surface():
+        img = img.convert()
     img.set_colorkey(colorkey)
     return img
 
@@ -16,16 +19,43 @@ def load_images(path, colorkey=DEFAULT_COLORKEY):
         images.append(load_image(path + '/' + img_name, colorkey))
     return images
 
+def blit_all(surf, blits) -> None:
+    # Draws a list of (image, position) pairs onto surf in one call.
+    # pygame-ce has Surface.fblits, which skips the per-sprite argument
+    # handling and dirty rects of Surface.blits; pygame only has blits.
+    if hasattr(surf, 'fblits'):
+        surf.fblits(blits)
+    else:
+        surf.blits(blits, doreturn=False)
+
+class SilentSound:
+    # Stands in for pygame.mixer.Sound when the game runs without audio.
+    def play(self, *args, **kwargs) -> None:
+        pass
+
+    def set_volume(self, value) -> None:
+        pass
+
 class Animation:
-    def __init__(self, images, img_dur=5, loop=True) -> None:
+    def __init__(self, images, img_dur=5, loop=True, flipped=None) -> None:
+        # flipped holds the images flipped left to right, made the first
+        # time they are asked for unless they come ready, as from an Atlas.
         self.images = images
+        self._flipped = flipped
         self.img_duration = img_dur
         self.loop = loop
         self.done = False
         self.frame = 0
     
+    @property
+    def flipped(self) -> list:
+        if self._flipped is None:
+            self._flipped = [pygame.transform.flip(img, True, False)
+                             for img in self.images]
+        return self._flipped
+
     def copy(self):
-        return Animation(self.images, self.img_duration, self.loop)
+        return Animation(self.images, self.img_duration, self.loop, self._flipped)
     
     def update(self):
         if self.loop:
@@ -37,5 +67,6 @@ class Animation:
             if self.frame >= self.img_duration * len(self.images) - 1:
                 self.done = True
     
-    def img(self):
-        return self.images[int(self.frame / self.img_duration)]
\ No newline at end of file
+    def img(self, flip=False):
+        images = self.flipped if flip else self.images
+        return images[int(self.frame / self.img_duration)]
\ No newline at end of file